@@ -1,177 +1,312 @@
+import calendar
 import json
-import os
-import time
+import re
 import urllib.parse
 from datetime import datetime, timedelta, timezone
+from email.utils import parsedate_to_datetime
+from io import BytesIO
 from typing import Dict, List
 from concurrent.futures import ThreadPoolExecutor, as_completed
 
 import feedparser
 import requests
-import yaml
+from requests.adapters import HTTPAdapter
 
+try:
+	import orjson
+
+	def _dumps(obj) -> str:
+		return orjson.dumps(obj).decode("utf-8")
+except ImportError:
+	def _dumps(obj) -> str:
+		return json.dumps(obj, ensure_ascii=False)
+
+try:
+	from lxml import etree
+except ImportError:
+	etree = None  # optional: falls back to feedparser
+
+from config import get_brand, get_config
 from db import get_conn
 
 UA = "Mozilla/5.0 (compatible; BrandMonitorBot/1.0; +https://example.com)"
 
-def get_brand(cfg: Dict) -> str:
-	return os.getenv("BRAND", cfg.get("project", {}).get("brand", "")).strip()
+INSERT_CHUNK_SIZE = 1000
+_WS_RE = re.compile(r"\s+")
+
+# one pooled keep-alive session shared by the fetch workers (many feeds share a host)
+_SESSION = requests.Session()
+_SESSION.headers.update({"User-Agent": "AI-Brand-Reputation-Monitor/1.0 (+local demo)"})
+_ADAPTER = HTTPAdapter(pool_connections=32, pool_maxsize=32)
+_SESSION.mount("http://", _ADAPTER)
+_SESSION.mount("https://", _ADAPTER)
+
+def _parse_date_text(value: str):
+	"""
+	Parse an RFC822 (RSS) or ISO 8601 (Atom) date string to UTC datetime, or None.
+	"""
+	value = (value or "").strip()
+	if not value:
+		return None
+	try:
+		dt = parsedate_to_datetime(value)
+	except (TypeError, ValueError, IndexError):
+		try:
+			dt = datetime.fromisoformat(value.replace("Z", "+00:00"))
+		except ValueError:
+			return None
+	if dt.tzinfo is None:
+		dt = dt.replace(tzinfo=timezone.utc)
+	return dt.astimezone(timezone.utc)
 
 
 def _parse_entry_datetime(entry):
 	"""
 	Return datetime UTC if available, otherwise None.
 	"""
+	for key in ["published", "updated"]:
+		dt = _parse_date_text(entry.get(key))
+		if dt:
+			return dt
+	# feedparser fallback for exotic date formats; *_parsed tuples are already UTC
 	for key in ["published_parsed", "updated_parsed"]:
 		st = entry.get(key)
 		if st:
-			return datetime.fromtimestamp(time.mktime(st), tz=timezone.utc)
+			return datetime.fromtimestamp(calendar.timegm(st), tz=timezone.utc)
 	return None
 
 
-def _fetch_feed(feed_url: str, timeout_sec: int = 6):
-	headers = {"User-Agent": "AI-Brand-Reputation-Monitor/1.0 (+local demo)"}
-	r = requests.get(feed_url, headers=headers, timeout=timeout_sec)
+def _local_name(tag) -> str:
+	return tag.rsplit("}", 1)[-1].lower() if isinstance(tag, str) else ""
+
+
+def _fast_parse(content: bytes):
+	"""
+	Streaming RSS/Atom parse with lxml, returning feedparser-like entry dicts
+	(title/link/id/summary/published/updated/tags only).
+	Returns None when lxml is missing or the feed is malformed (caller falls back to feedparser).
+	"""
+	if etree is None:
+		return None
+	entries = []
+	try:
+		for _, el in etree.iterparse(
+			BytesIO(content),
+			events=("end",),
+			tag=("{*}item", "{*}entry", "item", "entry"),
+			resolve_entities=False,
+			no_network=True,
+		):
+			entry = {"tags": []}
+			for child in el:
+				name = _local_name(child.tag)
+				text = (child.text or "").strip()
+				if name == "title":
+					entry["title"] = text
+				elif name == "link":
+					href = child.get("href")
+					if href is None:
+						entry.setdefault("link", text)
+					elif child.get("rel", "alternate") == "alternate":
+						entry.setdefault("link", href.strip())
+				elif name in ("guid", "id"):
+					entry.setdefault("id", text)
+				elif name in ("description", "summary"):
+					entry.setdefault("summary", text)
+				elif name == "content" or name == "encoded":
+					entry.setdefault("description", text)
+				elif name in ("pubdate", "published", "issued", "date"):
+					entry.setdefault("published", text)
+				elif name in ("updated", "modified"):
+					entry.setdefault("updated", text)
+				elif name in ("category", "subject"):
+					term = child.get("term") or text
+					if term:
+						entry["tags"].append({"term": term})
+			entries.append(entry)
+			# free parsed subtree + already processed siblings
+			el.clear()
+			while el.getprevious() is not None:
+				del el.getparent()[0]
+	except etree.XMLSyntaxError:
+		return None
+	return entries
+
+
+def _fetch_feed(feed_url: str, timeout_sec: int = 6) -> List:
+	r = _SESSION.get(feed_url, timeout=timeout_sec)
 	r.raise_for_status()
-	return feedparser.parse(r.content, agent=UA)
+	entries = _fast_parse(r.content)
+	if entries is None:
+		# malformed / non-XML feed: feedparser is slower but tolerant
+		entries = feedparser.parse(r.content, agent=UA).entries
+	return entries
+
+
+def _fetch_and_filter(
+	feed_url: str,
+	cutoff: datetime,
+	brand: str,
+	brand_terms_re: "re.Pattern",
+	brand_label: str,
+	timeout_sec: int = 6,
+	store_tags: bool = False,
+) -> List[tuple]:
+	"""
+	Fetch + parse + filter one feed inside the worker thread.
+	Returns ready-to-insert items_raw rows; the main thread only writes to DB.
+	"""
+	entries = _fetch_feed(feed_url, timeout_sec)
+	rows: List[tuple] = []
+
+	for entry in entries:
+		title = (entry.get("title") or "").strip()
+		link = (entry.get("link") or "").strip()
+
+		if not title or not link:
+			# skip silently to reduce log noise
+			continue
+
+		source_item_id = (entry.get("id") or entry.get("guid") or link).strip()
+
+		# --- Keyword filtering (mandatory) ---
+		title_txt = entry.get("title", "")
+		snippet_txt = entry.get("summary", "")
+		text = (title_txt + " " + snippet_txt).lower()
+
+		if brand and brand not in text:
+			# skip silently to reduce log noise
+			continue
+
+		# Rule: must contain the brand (early exit on first term found)
+		if not brand_terms_re.search(text):
+			# skip silently
+			continue
+
+		# Data pubblicazione (mandatory)
+		published_dt = _parse_entry_datetime(entry)
+		if published_dt is None:
+			# skip silently
+			continue  # skip if no published date
+
+		if published_dt < cutoff:
+			# skip silently
+			continue  # older than cutoff
+
+		metadata = {
+			"feed_url": feed_url,
+			"published": entry.get("published"),
+		}
+		if store_tags:
+			# never read downstream: opt-in via observe.store_tags
+			metadata["updated"] = entry.get("updated")
+			metadata["tags"] = [t.get("term") for t in entry.get("tags", []) if isinstance(t, dict)]
+
+		snippet = (entry.get("summary") or entry.get("description") or "").strip()
+		if snippet:
+			# one C-level pass instead of split() + join() token lists
+			snippet = _WS_RE.sub(" ", snippet)
+
+		rows.append((
+			"rss",
+			source_item_id,
+			brand_label,
+			title,
+			link,
+			snippet,
+			_dumps(metadata),
+			published_dt.strftime("%Y-%m-%d %H:%M:%S"),
+		))
+
+	return rows
 
 
 def collect_rss(cfg: Dict) -> int:
 	db_path = cfg["storage"]["db_path"]
-	days_back = int(cfg.get("observe", {}).get("days_back", 10))
+	# risolvi una volta i percorsi annidati della config
+	observe = cfg.get("observe")
+	if not isinstance(observe, dict):
+		observe = {}
+	brand_terms_cfg = (observe.get("keywords") or {}).get("brand_terms") or []
+	days_back = int(observe.get("days_back", 10))
 	cutoff = datetime.now(timezone.utc) - timedelta(days=days_back)
 
 	# Compat: supporta sia observe.rss.feeds (config attuale) sia observe.rss_feeds
-	feeds: List[str] = []
-	if "observe" in cfg:
-		if isinstance(cfg["observe"], dict):
-			feeds = (
-				cfg["observe"].get("rss_feeds")
-				or cfg["observe"].get("rss", {}).get("feeds", [])
-			)
-	feeds = feeds or []
+	feeds: List[str] = observe.get("rss_feeds") or (observe.get("rss") or {}).get("feeds") or []
 
 	# sostituisci placeholder [BRAND] con il brand runtime
 	brand_raw = get_brand(cfg)
 	if brand_raw:
 		brand_q = urllib.parse.quote_plus(brand_raw)
-		feeds = [f.replace("[BRAND]", brand_q) for f in feeds]
+		feeds = [f.replace("[BRAND]", brand_q) if "[BRAND]" in f else f for f in feeds]
 
 	if not feeds:
 		print("No RSS feeds configured (observe.rss.feeds).")
 		return 0
 
+	# invarianti del filtro calcolate una volta sola
+	brand = brand_raw.lower()
+	brand_terms = tuple(t.lower() for t in [brand] + list(brand_terms_cfg))
+	brand_terms_re = re.compile("|".join(map(re.escape, brand_terms)))
+	brand_label = brand_raw or brand
+	store_tags = bool(observe.get("store_tags", False))
+
+	insert_sql = """
+		INSERT OR IGNORE INTO items_raw (
+			source, source_item_id, brand,
+			title, url, content,
+			metadata_json,
+			published_at
+		)
+		VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+	"""
+
+	conn = get_conn(db_path)
+	cur = conn.cursor()
 	new_items = 0
-	parsed_feeds: List[tuple[str, list]] = []
+	buffer: List[tuple] = []
+
+	def flush() -> int:
+		# UNIQUE(source, source_item_id) drops duplicates server-side
+		cur.executemany(insert_sql, buffer)
+		conn.commit()
+		buffer.clear()
+		return max(cur.rowcount, 0)
 
-	# fetch feeds in parallel
+	# producer/consumer: workers fetch + parse + filter in parallel, the main
+	# thread (single DB writer) inserts each feed as soon as it completes
 	with ThreadPoolExecutor(max_workers=10) as ex:
-		futures = {ex.submit(_fetch_feed, feed_url, 6): feed_url for feed_url in feeds}
+		futures = {
+			ex.submit(
+				_fetch_and_filter, feed_url, cutoff, brand, brand_terms_re, brand_label, 6, store_tags
+			): feed_url
+			for feed_url in feeds
+		}
 		for fut in as_completed(futures):
 			feed_url = futures[fut]
 			try:
-				parsed = fut.result()
-				parsed_feeds.append((feed_url, parsed.entries))
+				candidates = fut.result()
 			except Exception as e:
 				print(f"RSS skip (error/timeout): {feed_url} | {type(e).__name__}: {e}")
 				continue
-
-	conn = get_conn(db_path)
-	cur = conn.cursor()
-
-	for feed_url, entries in parsed_feeds:
-		for entry in entries:
-			title = (entry.get("title") or "").strip()
-			link = (entry.get("link") or "").strip()
-
-			if not title or not link:
-				# skip silently to reduce log noise
+			if not candidates:
 				continue
 
-			source_item_id = (entry.get("id") or entry.get("guid") or link).strip()
-
-			# --- Keyword filtering (mandatory) ---
-			title_txt = entry.get("title", "")
-			snippet_txt = entry.get("summary", "")
-			text = (title_txt + " " + snippet_txt).lower()
+			print(f"RSS OK: {len(candidates)} matching items | {feed_url}")
+			buffer.extend(candidates)
+			# chunked commits keep memory and WAL growth bounded on large ingests
+			if len(buffer) >= INSERT_CHUNK_SIZE:
+				new_items += flush()
 
-			brand = get_brand(cfg).lower()
-			brand_terms = [brand] + cfg["observe"]["keywords"]["brand_terms"]
-
-			if brand and brand not in text:
-				# skip silently to reduce log noise
-				continue
-
-			brand_matches = sum(1 for t in brand_terms if t.lower() in text)
-
-			# Rule: must contain the brand
-			if brand_matches < 1:
-				# skip silently
-				continue
-
-			# Data pubblicazione (mandatory)
-			published_dt = _parse_entry_datetime(entry)
-			if published_dt is None:
-				# skip silently
-				continue  # skip if no published date
-
-			if published_dt < cutoff:
-				# skip silently
-				continue  # older than cutoff
-
-			metadata = {
-				"feed_url": feed_url,
-				"published": entry.get("published"),
-				"updated": entry.get("updated"),
-				"tags": [t.get("term") for t in entry.get("tags", []) if isinstance(t, dict)],
-			}
-
-			snippet = (entry.get("summary") or entry.get("description") or "").strip()
-			if snippet:
-				snippet = " ".join(snippet.split())
-
-			# dedup
-			cur.execute(
-				"SELECT 1 FROM items_raw WHERE source=? AND source_item_id=? LIMIT 1",
-				("rss", source_item_id),
-			)
-			if cur.fetchone():
-				# skip silently duplicates
-				continue
+	if buffer:
+		new_items += flush()
 
-			cur.execute(
-				"""
-				INSERT INTO items_raw (
-					source, source_item_id, brand,
-					title, url, content,
-					metadata_json,
-					published_at
-				)
-				VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-				""",
-				(
-					"rss",
-					source_item_id,
-					brand_raw or brand,
-					title,
-					link,
-					snippet,
-					json.dumps(metadata, ensure_ascii=False),
-					published_dt.strftime("%Y-%m-%d %H:%M:%S"),
-				),
-			)
-
-			print(f"RSS OK: {title} | {feed_url}")
-			new_items += 1
-
-	conn.commit()
 	conn.close()
 	return new_items
 
 
 def main():
-	with open("config.yaml", "r", encoding="utf-8") as f:
-		cfg = yaml.safe_load(f)
+	cfg = get_config()
 
 	n = collect_rss(cfg)
 	print(f"RSS collected: {n} new items")
@@ -0,0 +1,23 @@
+import os
+from functools import lru_cache
+from typing import Dict
+
+CONFIG_PATH = "config.yaml"
+
+
+@lru_cache(maxsize=1)
+def get_config() -> Dict:
+	"""
+	config.yaml letto e parsato una volta per processo (orchestrator: condiviso fra gli step).
+	Il dict è condiviso: trattarlo come read-only.
+	"""
+	import yaml  # lazy: keeps CLI startup light for modules that import this early
+
+	# libyaml C loader when available: same safe semantics as safe_load, parsed in C
+	loader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+	with open(CONFIG_PATH, "r", encoding="utf-8") as f:
+		return yaml.load(f, Loader=loader)
+
+
+def get_brand(cfg: Dict) -> str:
+	return os.getenv("BRAND", cfg.get("project", {}).get("brand", "")).strip()
@@ -1,23 +1,54 @@
 import os
 import re
 import sqlite3
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
 from pathlib import Path
-from typing import Iterable, Any
+from typing import Iterable, Iterator, Any
 
 try:
 	import psycopg2
-	from psycopg2.extras import RealDictCursor
+	from psycopg2.extras import RealDictCursor, execute_values
 except ImportError:
 	psycopg2 = None  # optional if using sqlite only
 
 POSTGRES_URL = os.getenv("POSTGRES_URL", "").strip()
+# transaction-mode poolers (PgBouncer, Neon "-pooler" host, Supabase :6543) hand each statement to
+# any backend: a PREPAREd name may not exist on the next one
+_POOLER_RE = re.compile(r"-pooler\.|:6543\b|pgbouncer=true", re.IGNORECASE)
+
+SQLITE_PRAGMAS = (
+	"PRAGMA journal_mode=WAL",
+	"PRAGMA synchronous=NORMAL",
+	"PRAGMA temp_store=MEMORY",
+	"PRAGMA cache_size=-65536",  # 64 MiB
+	"PRAGMA mmap_size=268435456",  # 256 MiB
+)
 
 
 def is_remote() -> bool:
 	return bool(POSTGRES_URL)
 
 
+# Postgres rewrites, compiled once (applied in order)
+_PG_REWRITES = (
+	# SQLite datetime('now','-7 days') -> Postgres NOW() - INTERVAL '7 days'
+	(re.compile(r"datetime\('now','-([0-9]+)\s+days?'\)", re.IGNORECASE), r"NOW() - INTERVAL '\1 days'"),
+	(re.compile(r"datetime\('now'\)", re.IGNORECASE), "CURRENT_TIMESTAMP"),
+	# Replace sqlite json_extract(x,'$.field') with Postgres json ->> field cast to float
+	(
+		re.compile(r"json_extract\(\s*([\w\.]+)\s*,\s*'\$\.([\w_]+)'\s*\)", re.IGNORECASE),
+		r"CAST((\1)::json->>'\2' AS DOUBLE PRECISION)",
+	),
+)
+
+
+_INSERT_OR_IGNORE_RE = re.compile(r"^(\s*)INSERT\s+OR\s+IGNORE\s+INTO\b(.*?)\s*;?\s*$", re.IGNORECASE | re.DOTALL)
+
+
+@lru_cache(maxsize=256)
 def _adapt_sql(sql: str, remote: bool) -> str:
+	# memoized: the same SQL text flows through every execute of a bulk write
 	if not remote:
 		return sql
 	s = sql
@@ -27,48 +58,129 @@ def _adapt_sql(sql: str, remote: bool) -> str:
 	s = s.replace("INTEGER PRIMARY KEY AUTOINCREMENT", "SERIAL PRIMARY KEY")
 	s = s.replace("INTEGER PRIMARY KEY", "SERIAL PRIMARY KEY")
 	s = s.replace("DEFAULT (datetime('now'))", "DEFAULT CURRENT_TIMESTAMP")
-	s = re.sub(r"datetime\\('now'\\)", "CURRENT_TIMESTAMP", s)
-	# SQLite datetime('now','-7 days') -> Postgres NOW() - INTERVAL '7 days'
-	s = re.sub(
-		r"datetime\('now','-([0-9]+)\s+days?'\)",
-		r"NOW() - INTERVAL '\1 days'",
-		s,
-		flags=re.IGNORECASE,
-	)
-	# Cast published_at (with optional table alias) to timestamp for comparisons
-	s = re.sub(
-		r"(\b[\w\.]*published_at\b)\s*>=",
-		r"CAST(\1 AS TIMESTAMP) >=",
-		s,
-		flags=re.IGNORECASE,
-	)
-	s = re.sub(
-		r"(\b[\w\.]*published_at\b)\s*<=",
-		r"CAST(\1 AS TIMESTAMP) <=",
-		s,
-		flags=re.IGNORECASE,
-	)
-	# Replace sqlite json_extract(x,'$.field') with Postgres json ->> field cast to float
-	s = re.sub(
-		r"json_extract\(\s*([\w\.]+)\s*,\s*'\$\.([\w_]+)'\s*\)",
-		r"CAST((\1)::json->>'\2' AS DOUBLE PRECISION)",
-		s,
-		flags=re.IGNORECASE,
-	)
+	# SQLite INSERT OR IGNORE -> Postgres ON CONFLICT DO NOTHING
+	m = _INSERT_OR_IGNORE_RE.match(s)
+	if m:
+		s = f"{m.group(1)}INSERT INTO{m.group(2)} ON CONFLICT DO NOTHING"
+	for pattern, repl in _PG_REWRITES:
+		s = pattern.sub(repl, s)
 	return s
 
 
+_INSERT_VALUES_RE = re.compile(
+	r"^(\s*INSERT\b.*?\bVALUES\s*)(\((?:\s*%s\s*,)*\s*%s\s*\))(\s*ON\s+CONFLICT\b.*?)?\s*;?\s*$",
+	flags=re.IGNORECASE | re.DOTALL,
+)
+
+
+@lru_cache(maxsize=64)
+def _split_insert_values(sql: str):
+	"""
+	Split an adapted 'INSERT ... VALUES (%s, ...)' into (statement, row template)
+	for psycopg2 execute_values; None if the SQL has another shape.
+	"""
+	m = _INSERT_VALUES_RE.match(sql)
+	if not m:
+		return None
+	return m.group(1) + "%s" + (m.group(3) or ""), m.group(2)
+
+
+_PREPARABLE_RE = re.compile(r"^\s*(SELECT|INSERT|UPDATE|DELETE|WITH)\b", re.IGNORECASE)
+_NOT_PREPARED = ""  # _prepared value: PREPARE/EXECUTE failed on this connection, run plain SQL
+
+
+def use_pg_prepare(url: str = POSTGRES_URL) -> bool:
+	"""
+	PG_PREPARE=1/0 forces server-side prepared statements on/off; default (auto): on,
+	except when the URL points at a transaction-mode pooler.
+	"""
+	flag = os.getenv("PG_PREPARE", "auto").strip().lower()
+	if flag in ("0", "false", "no"):
+		return False
+	if flag in ("1", "true", "yes"):
+		return True
+	return not _POOLER_RE.search(url)
+
+
+def _prepare_failed(exc: Exception) -> bool:
+	# 26000 invalid_sql_statement_name / 42P05 duplicate_prepared_statement: statement lives on another backend
+	return getattr(exc, "pgcode", None) in ("26000", "42P05")
+
+
 class ProxyCursor:
-	def __init__(self, cur):
+	def __init__(self, cur, prepared=None, seen=None):
 		self._cur = cur
+		# adapted SQL -> server-side statement name (shared per connection); None: never prepare
+		self._prepared = prepared
+		self._seen = seen if seen is not None else set()
+		# bind hot methods directly: skips the __getattr__ fallback on every call
+		self.fetchone = cur.fetchone
+		self.fetchall = cur.fetchall
+		self.fetchmany = cur.fetchmany
+		self.close = cur.close
+
+	@property
+	def rowcount(self):
+		return self._cur.rowcount
+
+	def __iter__(self):
+		return iter(self._cur)
+
+	def _prepared_sql(self, sql: str, repeated: bool):
+		"""
+		Return the 'EXECUTE stmt(%s, ...)' form of sql, issuing PREPARE once per
+		connection. Only DML with parameters is prepared, and only once it repeats.
+		"""
+		if self._prepared is None:
+			return None
+		name = self._prepared.get(sql)
+		if name == _NOT_PREPARED:
+			return None
+		if name is None:
+			n_params = sql.count("%s")
+			if not n_params or not _PREPARABLE_RE.match(sql):
+				return None
+			if not repeated and sql not in self._seen:
+				self._seen.add(sql)
+				return None
+			name = f"ooda_stmt_{len(self._prepared)}"
+			counter = iter(range(1, n_params + 1))
+			pg_sql = re.sub(r"%s", lambda _: f"${next(counter)}", sql.strip().rstrip(";"))
+			try:
+				self._cur.execute(f"PREPARE {name} AS {pg_sql}")
+			except psycopg2.Error as e:
+				if not _prepare_failed(e):
+					raise
+				self._prepared[sql] = _NOT_PREPARED
+				return None
+			self._prepared[sql] = name
+		return f"EXECUTE {name}({', '.join(['%s'] * sql.count('%s'))})"
+
+	def _run(self, method, sql: str, args, repeated: bool):
+		prepared = self._prepared_sql(sql, repeated=repeated)
+		if prepared is None:
+			return method(sql, args)
+		if repeated:
+			args = list(args)  # executemany rows replayable by the plain-SQL fallback
+		try:
+			return method(prepared, args)
+		except psycopg2.Error as e:
+			# pooled backend without our statement: plain SQL from now on (autocommit, nothing to roll back)
+			if not _prepare_failed(e):
+				raise
+			self._prepared[sql] = _NOT_PREPARED
+			return method(sql, args)
 
 	def execute(self, sql, params=()):
 		sql = _adapt_sql(sql, True)
-		return self._cur.execute(sql, params)
+		if not params:
+			# no params -> no %-formatting by psycopg2: a literal % (DDL comments, LIKE) stays as is
+			return self._cur.execute(sql)
+		return self._run(self._cur.execute, sql, params, repeated=False)
 
 	def executemany(self, sql, seq):
 		sql = _adapt_sql(sql, True)
-		return self._cur.executemany(sql, seq)
+		return self._run(self._cur.executemany, sql, seq, repeated=True)
 
 	def __getattr__(self, name):
 		return getattr(self._cur, name)
@@ -78,12 +190,16 @@ class ProxyConn:
 	def __init__(self, conn):
 		self._conn = conn
 		self.autocommit = True
+		self._prepared = {} if use_pg_prepare() else None
+		self._seen = set()
+		self.commit = conn.commit
+		self.close = conn.close
 
 	def cursor(self, *args, **kwargs):
 		# ensure we don't pass duplicate cursor_factory
 		kwargs.pop("cursor_factory", None)
 		cur = self._conn.cursor(cursor_factory=RealDictCursor, *args, **kwargs)
-		return ProxyCursor(cur)
+		return ProxyCursor(cur, self._prepared, self._seen)
 
 	def __getattr__(self, name):
 		return getattr(self._conn, name)
@@ -106,11 +222,59 @@ def get_conn(db_path: str):
 
 	# local sqlite fallback
 	Path(db_path).parent.mkdir(parents=True, exist_ok=True)
-	conn = sqlite3.connect(db_path)
+	conn = sqlite3.connect(db_path, isolation_level="DEFERRED")
 	conn.row_factory = sqlite3.Row
+	# WAL + relaxed fsync: one journal sync per checkpoint instead of per commit
+	for pragma in SQLITE_PRAGMAS:
+		conn.execute(pragma)
 	return conn
 
 
+def published_cutoff(days: int) -> str:
+	"""
+	UTC cutoff in the published_at TEXT format ("%Y-%m-%d %H:%M:%S"), to bind as a parameter:
+	plain string comparison on both engines, so the published_at index is usable.
+	"""
+	return (datetime.now(timezone.utc) - timedelta(days=days)).strftime("%Y-%m-%d %H:%M:%S")
+
+
+def json_field(col: str, field: str, numeric: bool = False) -> str:
+	"""
+	SQL expression extracting one top-level field from a JSON TEXT column,
+	evaluated by the DB engine (SQLite JSON1 / Postgres jsonb).
+	Nested objects/arrays come back as JSON text.
+	"""
+	if is_remote():
+		if numeric:
+			return (
+				f"CASE WHEN jsonb_typeof(({col})::jsonb->'{field}') = 'number' "
+				f"THEN (({col})::jsonb->>'{field}')::double precision END"
+			)
+		return f"({col})::jsonb->>'{field}'"
+	return f"CASE WHEN json_valid({col}) THEN json_extract({col}, '$.{field}') END"
+
+
+def iter_rows(conn: Any, sql: str, params: tuple = (), itersize: int = 1000) -> Iterator[Any]:
+	"""
+	Stream rows of a SELECT without materializing the full result set.
+	On Postgres a server-side (named) cursor is used; sqlite cursors are already lazy.
+	"""
+	if is_remote():
+		raw = getattr(conn, "_conn", conn)
+		# withhold: named cursors must survive autocommit mode
+		cur = raw.cursor(name="export_cursor", cursor_factory=RealDictCursor, withhold=True)
+		cur.itersize = itersize
+		cur.execute(_adapt_sql(sql, True), params)
+	else:
+		cur = conn.cursor()
+		cur.execute(sql, params)
+	try:
+		for row in cur:
+			yield row
+	finally:
+		cur.close()
+
+
 def exec_one(conn: Any, sql: str, params: tuple = ()) -> None:
 	remote = is_remote()
 	sql = _adapt_sql(sql, remote)
@@ -124,7 +288,13 @@ def exec_many(conn: Any, sql: str, rows: Iterable[tuple]) -> None:
 	remote = is_remote()
 	sql = _adapt_sql(sql, remote)
 	cur = conn.cursor(cursor_factory=RealDictCursor) if remote else conn.cursor()
-	if hasattr(cur, "executemany"):
+	split = _split_insert_values(sql) if remote else None
+	if split:
+		# one multi-row INSERT per page instead of one round-trip per row
+		stmt, template = split
+		raw_cur = getattr(cur, "_cur", cur)
+		execute_values(raw_cur, stmt, list(rows), template=template, page_size=1000)
+	elif hasattr(cur, "executemany"):
 		cur.executemany(sql, rows)
 	else:
 		for row in rows:
@@ -2,13 +2,18 @@ import json
 import os
 from datetime import datetime
 
-import yaml
+from config import get_config
 from db import get_conn
 
+try:
+	import orjson
+	_loads = orjson.loads
+except ImportError:
+	_loads = json.loads  # optional speed-up only
+
 
 def main():
-	with open("config.yaml", "r", encoding="utf-8") as f:
-		cfg = yaml.safe_load(f)
+	cfg = get_config()
 
 	db_path = cfg["storage"]["db_path"]
 
@@ -37,7 +42,7 @@ def main():
 		print("No ACT runs found. Run: python src/ooda_act.py")
 		return
 
-	obj = json.loads(row["act_json"])
+	obj = _loads(row["act_json"])
 	ts = datetime.now().strftime("%Y%m%d_%H%M%S")
 	out_dir = os.getenv("RUN_DIR", "outputs")
 	os.makedirs(out_dir, exist_ok=True)
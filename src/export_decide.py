@@ -3,22 +3,26 @@ import json
 import os
 from datetime import datetime
 
-import yaml
-from db import get_conn
+from config import get_config
+from db import get_conn, iter_rows
+
+try:
+	import orjson
+	_loads = orjson.loads
+except ImportError:
+	_loads = json.loads  # optional speed-up only
 
 
 def main():
 	# Load config
-	with open("config.yaml", "r", encoding="utf-8") as f:
-		cfg = yaml.safe_load(f)
+	cfg = get_config()
 
 	db_path = cfg["storage"]["db_path"]
 
 	conn = get_conn(db_path)
-	cur = conn.cursor()
 
 	# Join decide + raw (per avere titolo/url/snippet in export)
-	cur.execute("""
+	cur_rows = iter_rows(conn, """
 		SELECT
 			d.id AS decide_id,
 			d.raw_item_id AS raw_item_id,
@@ -35,11 +39,9 @@ def main():
 		LIMIT 500
 	""")
 
-	rows = []
-	for r in cur.fetchall():
-		obj = json.loads(r["decide_json"])
-
-		rows.append({
+	def project(r):
+		obj = _loads(r["decide_json"])
+		return {
 			"decide_id": r["decide_id"],
 			"orient_id": r["orient_id"],
 			"raw_item_id": r["raw_item_id"],
@@ -53,11 +55,13 @@ def main():
 			"rationale": obj.get("rationale"),
 			"no_regret_move": obj.get("no_regret_move"),
 			"decided_at": r["decided_at"],
-		})
+		}
 
-	conn.close()
+	rows = (project(r) for r in cur_rows)
+	first = next(rows, None)
 
-	if not rows:
+	if first is None:
+		conn.close()
 		print("No DECIDE items found.")
 		return
 
@@ -67,16 +71,21 @@ def main():
 	out_json = os.path.join(out_dir, f"decide_{ts}.json")
 	out_csv = os.path.join(out_dir, f"decide_{ts}.csv")
 
-	# JSON
-	with open(out_json, "w", encoding="utf-8") as f:
-		json.dump(rows, f, ensure_ascii=False, indent=2)
-
-	# CSV
-	with open(out_csv, "w", encoding="utf-8", newline="") as f:
-		w = csv.DictWriter(f, fieldnames=rows[0].keys())
-		w.writeheader()
+	# JSON + CSV, streamed row by row
+	with open(out_json, "w", encoding="utf-8") as fj, open(out_csv, "w", encoding="utf-8", newline="") as fc:
+		fieldnames = list(first.keys())
+		w = csv.writer(fc)
+		w.writerow(fieldnames)
+		fj.write("[\n")
+		fj.write(json.dumps(first, ensure_ascii=False, indent=2))
+		w.writerow([first.get(k, "") for k in fieldnames])
 		for row in rows:
-			w.writerow(row)
+			fj.write(",\n")
+			fj.write(json.dumps(row, ensure_ascii=False, indent=2))
+			w.writerow([row.get(k, "") for k in fieldnames])
+		fj.write("\n]")
+
+	conn.close()
 
 	print("Exported DECIDE results:")
 	print("-", out_json)
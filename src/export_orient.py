@@ -3,32 +3,35 @@ import json
 import os
 from datetime import datetime
 
-import yaml
-from db import get_conn
+from config import get_config
+from db import get_conn, iter_rows
+
+try:
+	import orjson
+	_loads = orjson.loads
+except ImportError:
+	_loads = json.loads  # optional speed-up only
 
 
 def main():
 	# Load config
-	with open("config.yaml", "r", encoding="utf-8") as f:
-		cfg = yaml.safe_load(f)
+	cfg = get_config()
 
 	db_path = cfg["storage"]["db_path"]
 
 	conn = get_conn(db_path)
-	cur = conn.cursor()
 
 	# Fetch latest ORIENT analyses
-	cur.execute("""
+	cur_rows = iter_rows(conn, """
 		SELECT id, raw_item_id, orient_json, created_at
 		FROM items_orient
 		ORDER BY id DESC
 		LIMIT 200
 	""")
 
-	rows = []
-	for r in cur.fetchall():
-		obj = json.loads(r["orient_json"])
-		rows.append({
+	def project(r):
+		obj = _loads(r["orient_json"])
+		return {
 			"orient_id": r["id"],
 			"raw_item_id": r["raw_item_id"],
 			"claim_summary": obj.get("claim_summary"),
@@ -38,11 +41,13 @@ def main():
 			"confidence": obj.get("confidence"),
 			"verification_steps": " | ".join(obj.get("verification_steps", [])),
 			"created_at": r["created_at"],
-		})
+		}
 
-	conn.close()
+	rows = (project(r) for r in cur_rows)
+	first = next(rows, None)
 
-	if not rows:
+	if first is None:
+		conn.close()
 		print("No ORIENT items found.")
 		return
 
@@ -53,16 +58,21 @@ def main():
 	out_json = os.path.join(out_dir, f"orient_{ts}.json")
 	out_csv = os.path.join(out_dir, f"orient_{ts}.csv")
 
-	# Save JSON
-	with open(out_json, "w", encoding="utf-8") as f:
-		json.dump(rows, f, ensure_ascii=False, indent=2)
-
-	# Save CSV
-	with open(out_csv, "w", encoding="utf-8", newline="") as f:
-		w = csv.DictWriter(f, fieldnames=rows[0].keys())
-		w.writeheader()
+	# Save JSON + CSV streaming row by row
+	with open(out_json, "w", encoding="utf-8") as fj, open(out_csv, "w", encoding="utf-8", newline="") as fc:
+		fieldnames = list(first.keys())
+		w = csv.writer(fc)
+		w.writerow(fieldnames)
+		fj.write("[\n")
+		fj.write(json.dumps(first, ensure_ascii=False, indent=2))
+		w.writerow([first.get(k, "") for k in fieldnames])
 		for r in rows:
-			w.writerow(r)
+			fj.write(",\n")
+			fj.write(json.dumps(r, ensure_ascii=False, indent=2))
+			w.writerow([r.get(k, "") for k in fieldnames])
+		fj.write("\n]")
+
+	conn.close()
 
 	print("Exported ORIENT results:")
 	print("-", out_json)
@@ -3,26 +3,24 @@ import json
 from datetime import datetime
 import os
 
-import yaml
-from db import get_conn
+from config import get_config
+from db import get_conn, iter_rows
+
+FIELDS = ["id", "source", "source_item_id", "title", "url", "published_at", "content", "metadata_json", "created_at"]
 
 
 def main():
-	with open("config.yaml", "r", encoding="utf-8") as f:
-		cfg = yaml.safe_load(f)
+	cfg = get_config()
 
 	db_path = cfg["storage"]["db_path"]
 	conn = get_conn(db_path)
-	cur = conn.cursor()
 
-	cur.execute("""
-		SELECT id, source, source_item_id, title, url, published_at, content, metadata_json, created_at
+	rows = iter_rows(conn, f"""
+		SELECT {", ".join(FIELDS)}
 		FROM items_raw
 		ORDER BY id DESC
 		LIMIT 200
 	""")
-	rows = [dict(r) for r in cur.fetchall()]
-	conn.close()
 
 	ts = datetime.now().strftime("%Y%m%d_%H%M%S")
 
@@ -32,14 +30,19 @@ def main():
 	out_json = os.path.join(out_dir, f"raw_{ts}.json")
 	out_csv = os.path.join(out_dir, f"raw_{ts}.csv")
 
-	with open(out_json, "w", encoding="utf-8") as f:
-		json.dump(rows, f, ensure_ascii=False, indent=2)
+	# stream rows straight into both files (no full in-memory list)
+	with open(out_json, "w", encoding="utf-8") as fj, open(out_csv, "w", encoding="utf-8", newline="") as fc:
+		w = csv.writer(fc)
+		w.writerow(FIELDS)
+		fj.write("[")
+		for i, r in enumerate(rows):
+			row = dict(r)
+			fj.write(",\n" if i else "\n")
+			fj.write(json.dumps(row, ensure_ascii=False, indent=2))
+			w.writerow([row[k] for k in FIELDS])
+		fj.write("\n]")
 
-	with open(out_csv, "w", encoding="utf-8", newline="") as f:
-		w = csv.DictWriter(f, fieldnames=rows[0].keys() if rows else ["empty"])
-		w.writeheader()
-		for r in rows:
-			w.writerow(r)
+	conn.close()
 
 	print(f"Exported:\n- {out_json}\n- {out_csv}")
 
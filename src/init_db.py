@@ -4,6 +4,7 @@ except ImportError:
 	def load_dotenv(*args, **kwargs):
 		# fallback: silently skip if python-dotenv not installed
 		return False
+from config import get_config
 from db import get_conn, exec_one
 from db import is_remote
 
@@ -29,6 +30,8 @@ CREATE TABLE IF NOT EXISTS items_raw (
 );
 
 CREATE INDEX IF NOT EXISTS idx_items_raw_url ON items_raw(url);
+-- published_at is fixed-width UTC "YYYY-MM-DD HH:MM:SS": lexicographic order == chronological
+CREATE INDEX IF NOT EXISTS idx_items_raw_published_at ON items_raw(published_at);
 
 CREATE TABLE IF NOT EXISTS items_orient (
 	id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -38,6 +41,9 @@ CREATE TABLE IF NOT EXISTS items_orient (
 	created_at TEXT NOT NULL DEFAULT (datetime('now'))
 );
 
+-- anti-join "not yet oriented" in ORIENT fetch_latest_items
+CREATE INDEX IF NOT EXISTS idx_items_orient_raw ON items_orient(raw_item_id);
+
 CREATE TABLE IF NOT EXISTS items_decide (
 	id INTEGER PRIMARY KEY AUTOINCREMENT,
 	raw_item_id INTEGER,
@@ -46,17 +52,17 @@ CREATE TABLE IF NOT EXISTS items_decide (
 	decide_json TEXT,
 	created_at TEXT NOT NULL DEFAULT (datetime('now'))
 );
+
+CREATE INDEX IF NOT EXISTS idx_items_decide_orient ON items_decide(orient_id);
 """
 
 
 def main():
-	import yaml
 	from pathlib import Path
 
 	load_dotenv()  # load POSTGRES_URL if present in .env
 
-	with open("config.yaml", "r", encoding="utf-8") as f:
-		cfg = yaml.safe_load(f)
+	cfg = get_config()
 
 	db_path = cfg["storage"]["db_path"]
 	if not is_remote():
@@ -68,10 +74,11 @@ def main():
 	else:
 		print(f"DB target: SQLite ({db_path})")
 
-	for stmt in DDL.strip().split(";"):
-		stmt = stmt.strip()
-		if stmt:
-			exec_one(conn, stmt + ";")
+	# whole DDL in one shot: one parse pass / one transaction
+	if is_remote():
+		exec_one(conn, DDL)
+	else:
+		conn.executescript(DDL)
 	conn.close()
 	if is_remote():
 		print("DB initialized: remote Postgres (Neon/Supabase)")
@@ -0,0 +1,140 @@
+import os
+import random
+import threading
+import time
+from contextlib import nullcontext
+from functools import lru_cache
+from importlib.util import find_spec
+
+import httpx
+from openai import DEFAULT_MAX_RETRIES, APIConnectionError, APITimeoutError, InternalServerError, OpenAI, RateLimitError
+
+# optional: h2 enables HTTP/2 multiplexing in httpx; only probed, httpx imports it itself
+HTTP2 = find_spec("h2") is not None
+
+# pool sized above the largest ThreadPoolExecutor fan-out (DECIDE: 30 workers),
+# so parallel calls reuse keep-alive TLS connections instead of opening new ones
+HTTP_LIMITS = httpx.Limits(max_connections=64, max_keepalive_connections=64)
+HTTP_TIMEOUT = 60
+
+# two-tier throttle shared by every worker thread: max in-flight calls + optional requests/sec cap
+OPENAI_CONCURRENCY = int(os.getenv("OPENAI_CONCURRENCY", "20"))  # <= 0 = no in-flight cap
+OPENAI_RPS = float(os.getenv("OPENAI_RPS", "0"))  # 0 = no RPS cap
+RETRY_ATTEMPTS = 5
+RETRY_BASE_SEC = 2
+RETRY_MAX_SEC = 32
+RETRYABLE_ERRORS = (RateLimitError, APITimeoutError, APIConnectionError, InternalServerError)
+
+# a zero-count semaphore would block every call forever: <= 0 means unbounded
+_SEM = threading.BoundedSemaphore(OPENAI_CONCURRENCY) if OPENAI_CONCURRENCY > 0 else nullcontext()
+
+
+class _RateLimiter:
+	"""
+	Spaces call starts at >= 1/rps seconds (time.monotonic), thread-safe.
+	"""
+
+	def __init__(self, rps: float):
+		self.interval = 1.0 / rps if rps > 0 else 0.0
+		self.next_at = 0.0
+		self.lock = threading.Lock()
+
+	def wait(self) -> None:
+		if not self.interval:
+			return
+		with self.lock:
+			now = time.monotonic()
+			start = max(now, self.next_at)
+			self.next_at = start + self.interval
+		if start > now:
+			time.sleep(start - now)
+
+
+_RATE = _RateLimiter(OPENAI_RPS)
+
+
+@lru_cache(maxsize=None)
+def get_client(api_key: str) -> OpenAI:
+	"""
+	OpenAI client condiviso (uno per processo / api_key), con connection pool esplicito.
+	"""
+	http_client = httpx.Client(limits=HTTP_LIMITS, timeout=HTTP_TIMEOUT, http2=HTTP2)
+	# completions/embeddings: retries handled by _with_retry (one policy, throttle-aware), not by the SDK;
+	# every other endpoint goes through sdk_retrying()
+	return OpenAI(api_key=api_key, http_client=http_client, max_retries=0)
+
+
+def sdk_retrying(client: OpenAI) -> OpenAI:
+	"""
+	Same client (shared http pool) with the SDK's default retries back on, for the calls that do not
+	go through _with_retry: models.list smoke tests, Batch API files/batches (POSTs keep the SDK's
+	idempotency key across its retries).
+	"""
+	return client.with_options(max_retries=DEFAULT_MAX_RETRIES)
+
+
+def _with_retry(fn):
+	"""
+	Exponential backoff with jitter on 429 / timeouts / connection errors / 5xx.
+	"""
+	for attempt in range(RETRY_ATTEMPTS):
+		try:
+			return fn()
+		except RETRYABLE_ERRORS:
+			if attempt == RETRY_ATTEMPTS - 1:
+				raise
+			delay = min(RETRY_MAX_SEC, RETRY_BASE_SEC * 2 ** attempt)
+			time.sleep(delay / 2 + random.uniform(0, delay / 2))
+
+
+def chat_completion(client: OpenAI, **kwargs):
+	"""
+	chat.completions.create throttled (semaphore + RPS) and retried.
+	"""
+	def call():
+		with _SEM:
+			_RATE.wait()
+			return client.chat.completions.create(**kwargs)
+
+	return _with_retry(call)
+
+
+def create_embeddings(client: OpenAI, **kwargs):
+	"""
+	embeddings.create with the same throttle + retry as chat_completion.
+	"""
+	def call():
+		with _SEM:
+			_RATE.wait()
+			return client.embeddings.create(**kwargs)
+
+	return _with_retry(call)
+
+
+def stream_text(client: OpenAI, **kwargs) -> str:
+	"""
+	chat.completions in streaming: accumula i delta e ritorna il testo completo.
+	"""
+	def call():
+		# the slot is held for the whole stream: it tracks real server-side concurrency
+		with _SEM:
+			_RATE.wait()
+			stream = client.chat.completions.create(stream=True, **kwargs)
+			parts = []
+			try:
+				for chunk in stream:
+					if chunk.choices and chunk.choices[0].delta.content:
+						parts.append(chunk.choices[0].delta.content)
+			finally:
+				stream.close()
+			return "".join(parts)
+
+	return _with_retry(call)
+
+
+def canonical_prompt(text: str) -> str:
+	"""
+	LF line endings, no trailing whitespace: any drift in the static prefix breaks prompt caching.
+	"""
+	lines = text.replace("\r\n", "\n").replace("\r", "\n").split("\n")
+	return "\n".join(line.rstrip() for line in lines).strip()
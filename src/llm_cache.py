@@ -0,0 +1,57 @@
+import hashlib
+from typing import Dict, Iterable, List, Tuple
+
+from db import is_remote
+
+try:
+	import orjson
+
+	def _canonical_body(body: Dict) -> bytes:
+		return orjson.dumps(body, option=orjson.OPT_SORT_KEYS)
+except ImportError:
+	import json
+
+	def _canonical_body(body: Dict) -> bytes:
+		return json.dumps(body, ensure_ascii=False, sort_keys=True, separators=(",", ":")).encode("utf-8")
+
+
+def ensure_cache_table(conn) -> None:
+	cur = conn.cursor()
+	# WITHOUT ROWID: the hash PK is the table b-tree, a lookup is a single probe
+	suffix = "" if is_remote() else " WITHOUT ROWID"
+	cur.execute(f"""
+	CREATE TABLE IF NOT EXISTS llm_cache (
+		k TEXT PRIMARY KEY,
+		model TEXT,
+		resp TEXT,
+		created_at TEXT NOT NULL DEFAULT (datetime('now'))
+	){suffix}
+	""")
+	conn.commit()
+
+
+def cache_key(body: Dict) -> str:
+	"""
+	sha256 of the full request body (model + canonical system/user messages + options).
+	"""
+	return hashlib.sha256(_canonical_body(body)).hexdigest()
+
+
+def get_many(conn, keys: Iterable[str]) -> Dict[str, str]:
+	keys = list(dict.fromkeys(keys))
+	if not keys:
+		return {}
+	cur = conn.cursor()
+	placeholders = ",".join("?" for _ in keys)
+	cur.execute(f"SELECT k, resp FROM llm_cache WHERE k IN ({placeholders})", tuple(keys))
+	return {r["k"]: r["resp"] for r in cur.fetchall()}
+
+
+def put_many(conn, entries: List[Tuple[str, str, str]]) -> None:
+	"""
+	entries: (key, model, response_text). Caller commits.
+	"""
+	if not entries:
+		return
+	cur = conn.cursor()
+	cur.executemany("INSERT OR IGNORE INTO llm_cache (k, model, resp) VALUES (?, ?, ?)", entries)
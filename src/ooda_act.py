@@ -1,23 +1,43 @@
+import heapq
+import io
 import json
 import os
 from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from typing import Dict, List
+from operator import itemgetter
+from typing import TYPE_CHECKING, Dict, List
 
-import yaml
 from dotenv import load_dotenv
-from openai import OpenAI
-from openpyxl import Workbook
-from openpyxl.utils import get_column_letter
-from openpyxl.styles import Font, Alignment
 
-from db import get_conn, is_remote
+from config import get_brand, get_config
+from db import get_conn, is_remote, json_field, published_cutoff
 
-MODEL = "gpt-5-mini"  # come hai scelto tu
+try:
+	import orjson
+	_loads = orjson.loads
+
+	def _dumps(obj) -> str:
+		# compact JSON (used in prompts: no whitespace tokens sent to the LLM)
+		return orjson.dumps(obj).decode("utf-8")
+
+	def _dumps_pretty(obj) -> str:
+		return orjson.dumps(obj, option=orjson.OPT_INDENT_2).decode("utf-8")
+except ImportError:
+	_loads = json.loads  # optional speed-up only
 
+	def _dumps(obj) -> str:
+		return json.dumps(obj, ensure_ascii=False, separators=(",", ":"))
 
-def get_brand(cfg: Dict) -> str:
-	return os.getenv("BRAND", cfg.get("project", {}).get("brand", "")).strip()
+	def _dumps_pretty(obj) -> str:
+		return json.dumps(obj, ensure_ascii=False, indent=2)
+
+if TYPE_CHECKING:
+	from openai import OpenAI
+
+# yaml / openai / openpyxl are imported lazily where used (faster CLI startup)
+
+MODEL = "gpt-5-mini"  # come hai scelto tu
 
 
 def ensure_act_table(conn) -> None:
@@ -50,6 +70,24 @@ def table_exists(conn, table_name: str) -> bool:
 	return cur.fetchone() is not None
 
 
+ORIENT_FIELDS = ["claim_summary", "narrative_category", "reputational_risk", "severity", "confidence", "verification_steps"]
+ORIENT_NUMERIC_FIELDS = {"severity", "confidence"}
+DECIDE_FIELDS = ["intent_framing", "urgency", "recommended_action", "escalation_team", "rationale", "no_regret_move"]
+JSON_LIST_FIELDS = ["verification_steps", "escalation_team"]
+
+
+def _json_list(value):
+	if value is None:
+		return []
+	if isinstance(value, list):
+		return value
+	try:
+		return _loads(value)
+	except (TypeError, ValueError):
+		# plain string stored instead of an array
+		return value
+
+
 def fetch_full_ooda_view(db_path: str, brand: str, limit: int = 50) -> List[Dict]:
 	"""
 	Join completo: raw + orient + decide.
@@ -60,89 +98,102 @@ def fetch_full_ooda_view(db_path: str, brand: str, limit: int = 50) -> List[Dict
 		conn.close()
 		raise RuntimeError("Table items_decide not found. Run: python src/ooda_decide.py")
 
+	# JSON fields extracted by the DB engine: no per-row json.loads of the full blobs
+	orient_cols = ",\n\t\t\t".join(
+		f"{json_field('o.orient_json', f, numeric=f in ORIENT_NUMERIC_FIELDS)} AS {f}"
+		for f in ORIENT_FIELDS
+	)
+	decide_cols = ",\n\t\t\t".join(
+		f"{json_field('d.decide_json', f)} AS {f}" for f in DECIDE_FIELDS
+	)
+
 	cur = conn.cursor()
-	cur.execute("""
+	cur.execute(f"""
 		SELECT
 			d.id AS decide_id,
 			d.created_at AS decided_at,
-			d.decide_json AS decide_json,
 			d.orient_id AS orient_id,
 			d.raw_item_id AS raw_item_id,
 
 			r.source AS source,
 			r.title AS title,
 			r.url AS url,
-			r.content AS snippet,
-			r.metadata_json AS raw_metadata_json,
+			-- truncated by the engine: long article bodies (PG: TOAST) never reach Python
+			SUBSTR(r.content, 1, 800) AS snippet,
 			r.created_at AS observed_at,
 			r.published_at AS published_at,
 
-			o.orient_json AS orient_json,
+			-- ORIENT fields
+			{orient_cols},
+
+			-- DECIDE fields
+			{decide_cols},
+
+			-- timestamps
 			o.created_at AS oriented_at
 
 		FROM items_decide d
 		LEFT JOIN items_raw r ON r.id = d.raw_item_id
 		LEFT JOIN items_orient o ON o.id = d.orient_id
-		WHERE r.published_at >= datetime('now','-7 days')
+		WHERE r.published_at >= ?
 		AND d.brand = ?
 		ORDER BY d.id DESC
 		LIMIT ?
-	""", (brand, limit))
+	""", (published_cutoff(7), brand, limit))
 
 	rows = []
 	for r in cur.fetchall():
-		decide = json.loads(r["decide_json"]) if r["decide_json"] else {}
-		orient = {}
-		try:
-			orient = json.loads(r["orient_json"]) if r["orient_json"] else {}
-		except Exception:
-			orient = {}
-
-		rows.append({
-			"decide_id": r["decide_id"],
-			"decided_at": r["decided_at"],
-			"orient_id": r["orient_id"],
-			"raw_item_id": r["raw_item_id"],
-
-			"source": r["source"],
-			"title": r["title"],
-			"url": r["url"],
-			"snippet": (r["snippet"] or "")[:800].replace("\n", " ").strip(),
-			"observed_at": r["observed_at"],
-			"published_at": r["published_at"],
-
-			# ORIENT fields
-			"claim_summary": orient.get("claim_summary"),
-			"narrative_category": orient.get("narrative_category"),
-			"reputational_risk": orient.get("reputational_risk"),
-			"severity": orient.get("severity"),
-			"confidence": orient.get("confidence"),
-			"verification_steps": orient.get("verification_steps", []),
-
-			# DECIDE fields
-			"intent_framing": decide.get("intent_framing"),
-			"urgency": decide.get("urgency"),
-			"recommended_action": decide.get("recommended_action"),
-			"escalation_team": decide.get("escalation_team", []),
-			"rationale": decide.get("rationale"),
-			"no_regret_move": decide.get("no_regret_move"),
-
-			# timestamps
-			"oriented_at": r["oriented_at"],
-		})
+		row = dict(r)
+		row["snippet"] = (row["snippet"] or "").replace("\n", " ").strip()
+		# array fields come back as JSON text
+		for key in JSON_LIST_FIELDS:
+			row[key] = _json_list(row.get(key))
+		rows.append(row)
 
 	conn.close()
 	return rows
 
 
+PRIORITY_URGENCIES = frozenset({"high", "medium"})
+_NUMBER_TYPES = (int, float)
+
+
 def compute_stats(items: List[Dict]) -> Dict:
-	intents = [str(i.get("intent_framing") or "NEUTRAL").upper() for i in items]
-	urgencies = [str(i.get("urgency") or "low").lower() for i in items]
-	cats = [str(i.get("narrative_category") or "other") for i in items]
-	risks = [str(i.get("reputational_risk") or "low") for i in items]
-	severities = [i.get("severity") for i in items if isinstance(i.get("severity"), (int, float))]
+	# single pass collects struct-of-arrays columns; counting/reductions then run
+	# in C (Counter's _count_elements, min/max/sum) instead of per-item Python updates
+	intents = []
+	urgencies = []
+	cats = []
+	risks = []
+	severities = []
+	top_heap = []  # bounded min-heap of (severity, -index, item), size <= 5
+	priority = []
+
+	for idx, it in enumerate(items):
+		intent = str(it.get("intent_framing") or "NEUTRAL").upper()
+		urg = str(it.get("urgency") or "low").lower()
+		intents.append(intent)
+		urgencies.append(urg)
+		cats.append(str(it.get("narrative_category") or "other"))
+		risks.append(str(it.get("reputational_risk") or "low"))
+
+		sev = it.get("severity")
+		has_sev = isinstance(sev, _NUMBER_TYPES)
+		if has_sev:
+			severities.append(sev)
+			# top 5 items by severity (ties keep input order)
+			entry = (sev, -idx, it)
+			if len(top_heap) < 5:
+				heapq.heappush(top_heap, entry)
+			elif entry[:2] > top_heap[0][:2]:
+				heapq.heapreplace(top_heap, entry)
+
+		# Priority heuristic: THREAT high/medium urgency OR severity>=60
+		if intent == "THREAT" and urg in PRIORITY_URGENCIES:
+			priority.append(it)
+		elif has_sev and sev >= 60:
+			priority.append(it)
 
-	severity_stats = {}
 	if severities:
 		severity_stats = {
 			"min": int(min(severities)),
@@ -152,35 +203,15 @@ def compute_stats(items: List[Dict]) -> Dict:
 	else:
 		severity_stats = {"min": None, "max": None, "avg": None}
 
-	# Bucket severities so ORIENT high/medium/low reflects numeric scores
-	severity_buckets = Counter(
-		"high" if s >= 70 else "medium" if s >= 40 else "low"
-		for s in severities
-	)
-
 	intent_counts = Counter(intents)
 	urgency_counts = Counter(urgencies)
 	cat_counts = Counter(cats)
 	# Merge declared reputational_risk with severity buckets to avoid mismatches
-	risk_counts = Counter(risks) + severity_buckets
+	# (bucket severities so ORIENT high/medium/low reflects numeric scores)
+	risk_counts = Counter(risks)
+	risk_counts.update("high" if s >= 70 else "medium" if s >= 40 else "low" for s in severities)
 
-	# top 5 items by severity
-	top_by_severity = sorted(
-		[i for i in items if isinstance(i.get("severity"), (int, float))],
-		key=lambda x: x["severity"],
-		reverse=True
-	)[:5]
-
-	# Priority heuristic: THREAT high/medium urgency OR severity>=60
-	priority = []
-	for it in items:
-		intent = (it.get("intent_framing") or "NEUTRAL").upper()
-		urg = (it.get("urgency") or "low").lower()
-		sev = it.get("severity")
-		if intent == "THREAT" and urg in ["high", "medium"]:
-			priority.append(it)
-		elif isinstance(sev, (int, float)) and sev >= 60:
-			priority.append(it)
+	top_by_severity = [e[2] for e in sorted(top_heap, key=lambda e: e[:2], reverse=True)]
 
 	return {
 		"counts": {
@@ -204,41 +235,141 @@ def compute_stats(items: List[Dict]) -> Dict:
 	}
 
 
-def build_act_prompt(brand: str, stats: Dict, items: List[Dict]) -> str:
+ACT_SCHEMA = """
+{
+  "ooda_timeline": {
+    "observe": "what was monitored and why",
+    "orient": "how items were classified and scored",
+    "decide": "how intent was determined and decisions made",
+    "act": "what actions will be executed next"
+  },
+  "executive_summary": ["max 6 bullets"],
+  "situation_overview": {
+    "top_themes": ["..."],
+    "overall_risk_level": "low|medium|high",
+    "what_changed": "1-2 sentences",
+    "why_now": "1-2 sentences"
+  },
+  "decision_intelligence": {
+    "intent_distribution": {},
+    "urgency_distribution": {},
+    "top_items_by_severity": []
+  },
+  "action_plan_next_4_hours": [
+    {
+      "priority": 1,
+      "item_title": "...",
+      "intent_framing": "THREAT|DEFENSE|OPPORTUNITY|NEUTRAL|NOISE",
+      "urgency": "low|medium|high",
+      "objective": "...",
+      "owner_team": ["PR","Legal","Security","Exec","Social"],
+      "first_3_steps": ["...","...","..."],
+      "success_criteria": ["..."],
+      "notes": "short"
+    }
+  ],
+  "comms_package": {
+    "internal_message_draft": "short message to internal stakeholders",
+    "external_holding_statement": "only if THREAT exists; otherwise 'not needed'",
+    "optional_reinforcement_message": "useful especially for DEFENSE cases"
+  },
+  "monitoring_and_triggers": {
+    "what_to_watch": ["..."],
+    "update_frequency": "e.g. every 60 minutes",
+    "escalation_triggers": ["..."],
+    "de_escalation_triggers": ["..."]
+  },
+  "risks_and_liability": {
+    "highest_risk_if_followed_blindly": "1-2 sentences",
+    "human_judgment_overrides": ["..."]
+  }
+}
+""".strip()
+
+
+ACT_RULES = {
+	"THREAT": "containment + fact-check + alignment PR/Legal + rapid response plan",
+	"DEFENSE": "do NOT escalate; monitor + reputation reinforcement (brand fighting issue)",
+	"OPPORTUNITY": "leverage positive narrative",
+	"NEUTRAL/NOISE": "log/ignore unless triggers fire"
+}
+
+
+COMPACT_KEYS = (
+	"title",
+	"url",
+	"snippet",
+	"severity",
+	"narrative_category",
+	"reputational_risk",
+	"claim_summary",
+	"intent_framing",
+	"urgency",
+	"recommended_action",
+	"no_regret_move",
+)
+_compact_get = itemgetter(*COMPACT_KEYS)
+
+
+def compact_item(it: Dict) -> Dict:
+	# items come from fetch_full_ooda_view, which always sets every COMPACT_KEYS column
+	return dict(zip(COMPACT_KEYS, _compact_get(it)))
+
+
+def build_act_item_prompt(brand: str, item: Dict) -> str:
 	"""
-	ACT aggregato “full”: Executive brief + action plan + monitoring + comms + triggers.
-	Passa:
-	- stats
-	- top by severity
-	- subset di items (non tutti per token)
+	ACT "map": micro action card per singolo item (eseguito in parallelo).
 	"""
-	# compressione items per prompt: prendiamo max 12
-	compact_items = []
-	for it in items[:12]:
-		compact_items.append({
-			"title": it.get("title"),
-			"url": it.get("url"),
-			"snippet": it.get("snippet"),
-			"severity": it.get("severity"),
-			"narrative_category": it.get("narrative_category"),
-			"reputational_risk": it.get("reputational_risk"),
-			"claim_summary": it.get("claim_summary"),
-			"intent_framing": it.get("intent_framing"),
-			"urgency": it.get("urgency"),
-			"recommended_action": it.get("recommended_action"),
-			"no_regret_move": it.get("no_regret_move"),
-		})
+	payload = {
+		"brand": brand,
+		"item": item,
+		"rules": ACT_RULES,
+	}
+
+	return f"""
+ROLE: You are the ACT module of an OODA Loop AI early-warning system for brand reputation monitoring.
+You turn ONE prior decision into an executable action card for the next 4 hours.
+
+FRAMEWORK CONSTRAINT (ACT ONLY):
+- Do NOT reclassify the item. Do NOT invent new facts. Use ONLY the input JSON provided (item + rules).
+- If information is insufficient, choose conservative 'no-regret' actions and monitoring.
+
+BRAND: {brand}
+
+CRITICAL INTERPRETATION RULE:
+- If the item describes enforcement already happening (seizure/crackdown/counterfeit removal) and the brand is not accused, treat as DEFENSE: do NOT recommend legal escalation against the brand.
+- Keep actions proportional to urgency (low=monitor/log, medium=prepare, high=activate crisis response).
+- Legal only if the item explicitly indicates legal exposure for the brand.
+
+OUTPUT RULES:
+Return ONLY valid JSON with EXACTLY these fields:
+{{
+  "item_title": "title of the item (echo input)",
+  "intent_framing": "THREAT|DEFENSE|OPPORTUNITY|NEUTRAL|NOISE (echo input)",
+  "urgency": "low|medium|high (echo input)",
+  "objective": "...",
+  "owner_team": ["PR","Legal","Security","Exec","Social"],
+  "first_3_steps": ["...","...","..."],
+  "success_criteria": ["..."],
+  "notes": "short"
+}}
 
+INPUT JSON (use as the ONLY source of truth):
+{_dumps(payload)}
+""".strip()
+
+
+def build_act_reduce_prompt(brand: str, stats: Dict, item_actions: List[Dict]) -> str:
+	"""
+	ACT "reduce": aggrega le action card per item in un unico pacchetto
+	(Executive brief + action plan + monitoring + comms + triggers).
+	Passa solo stats + action card compatte (non gli item completi) per contenere i token.
+	"""
 	payload = {
 		"brand": brand,
 		"stats": stats,
-		"items_sample": compact_items,
-		"rules": {
-			"THREAT": "containment + fact-check + alignment PR/Legal + rapid response plan",
-			"DEFENSE": "do NOT escalate; monitor + reputation reinforcement (brand fighting issue)",
-			"OPPORTUNITY": "leverage positive narrative",
-			"NEUTRAL/NOISE": "log/ignore unless triggers fire"
-		}
+		"item_actions": item_actions,
+		"rules": ACT_RULES,
 	}
 
 	return f"""
@@ -246,8 +377,8 @@ ROLE: You are the ACT module of an OODA Loop AI early-warning system for brand r
 You are an executive coordinator producing an action package.
 
 FRAMEWORK CONSTRAINT (ACT ONLY):
-- This is ACT: convert prior decisions into an executable plan for the next 4 hours.
-- Do NOT reclassify items. Do NOT invent new facts. Use ONLY the input JSON provided (stats + items_sample + rules).
+- This is ACT: convert prior per-item action cards into ONE executable plan for the next 4 hours.
+- Do NOT reclassify items. Do NOT invent new facts. Use ONLY the input JSON provided (stats + item_actions + rules).
 - If information is insufficient, explicitly choose conservative 'no-regret' actions and monitoring.
 
 BRAND: {brand}
@@ -255,9 +386,6 @@ BRAND: {brand}
 OBJECTIVE:
 Produce ONE aggregated action package to be executed as soon as possible, grounded in the input data and consistent with ORIENT+DECIDE outputs.
 
-CRITICAL INTERPRETATION RULE:
-- If the item describes enforcement already happening (seizure/crackdown/counterfeit removal) and the brand is not accused, treat as DEFENSE: do NOT recommend legal escalation against the brand. Focus on monitoring + optional reputation reinforcement.
-
 GATING RULES (avoid overreaction):
 - If there are ZERO items with intent_framing="THREAT", then:
   - comms_package.external_holding_statement MUST be "not needed"
@@ -269,190 +397,159 @@ OUTPUT RULES:
 - Return ONLY valid JSON matching EXACTLY the schema below.
 - Keep executive_summary to max 6 short bullets.
 - In top_items_by_severity include max 5 items, each as a compact object with title, url, severity, intent_framing, urgency.
-- In action_plan_next_4_hours include 3 to 6 actions maximum.
-- Every action must reference a specific item_title from items_sample (or "cross-cutting").
+- In action_plan_next_4_hours include 3 to 6 actions maximum, selected/merged from item_actions.
+- Every action must reference a specific item_title from item_actions (or "cross-cutting").
 
 REQUIRED JSON SCHEMA:
-{{
-  "ooda_timeline": {{
-    "observe": "what was monitored and why",
-    "orient": "how items were classified and scored",
-    "decide": "how intent was determined and decisions made",
-    "act": "what actions will be executed next"
-  }},
-  "executive_summary": ["max 6 bullets"],
-  "situation_overview": {{
-    "top_themes": ["..."],
-    "overall_risk_level": "low|medium|high",
-    "what_changed": "1-2 sentences",
-    "why_now": "1-2 sentences"
-  }},
-  "decision_intelligence": {{
-    "intent_distribution": {{}},
-    "urgency_distribution": {{}},
-    "top_items_by_severity": []
-  }},
-  "action_plan_next_4_hours": [
-    {{
-      "priority": 1,
-      "item_title": "...",
-      "intent_framing": "THREAT|DEFENSE|OPPORTUNITY|NEUTRAL|NOISE",
-      "urgency": "low|medium|high",
-      "objective": "...",
-      "owner_team": ["PR","Legal","Security","Exec","Social"],
-      "first_3_steps": ["...","...","..."],
-      "success_criteria": ["..."],
-      "notes": "short"
-    }}
-  ],
-  "comms_package": {{
-    "internal_message_draft": "short message to internal stakeholders",
-    "external_holding_statement": "only if THREAT exists; otherwise 'not needed'",
-    "optional_reinforcement_message": "useful especially for DEFENSE cases"
-  }},
-  "monitoring_and_triggers": {{
-    "what_to_watch": ["..."],
-    "update_frequency": "e.g. every 60 minutes",
-    "escalation_triggers": ["..."],
-    "de_escalation_triggers": ["..."]
-  }},
-  "risks_and_liability": {{
-    "highest_risk_if_followed_blindly": "1-2 sentences",
-    "human_judgment_overrides": ["..."]
-  }}
-}}
+{ACT_SCHEMA}
 
 INPUT JSON (use as the ONLY source of truth):
-{json.dumps(payload, ensure_ascii=False)}
+{_dumps(payload)}
 """.strip()
 
 
+def act_item(client: "OpenAI", brand: str, item: Dict) -> Dict:
+	from llm import stream_text
+
+	text = stream_text(
+		client,
+		model=MODEL,
+		messages=[{"role": "user", "content": build_act_item_prompt(brand, item)}],
+		response_format={"type": "json_object"},
+		timeout=45,
+	)
+	obj = _loads(text)
+	obj.setdefault("item_title", item.get("title"))
+	return obj
+
+
 def to_markdown(act: Dict, stats: Dict, items: List[Dict], brand: str, ts: str) -> str:
-	lines = []
-	lines.append(f"# ACT FULL — Executive Brief (OODA) — {brand}")
-	lines.append(f"_Generated: {ts}_\n")
+	buf = io.StringIO()
+	w = buf.write
+
+	def json_block(title: str, obj) -> None:
+		w(f"{title}\n```json\n")
+		w(_dumps_pretty(obj))
+		w("\n```\n")
 
-	lines.append("## OODA Timeline")
-	lines.append("```json")
-	lines.append(json.dumps(act.get("ooda_timeline", {}), ensure_ascii=False, indent=2))
-	lines.append("```")
+	w(f"# ACT FULL — Executive Brief (OODA) — {brand}\n")
+	w(f"_Generated: {ts}_\n\n")
 
-	lines.append("\n## Executive Summary")
+	json_block("## OODA Timeline", act.get("ooda_timeline", {}))
+
+	w("\n## Executive Summary\n")
 	for b in act.get("executive_summary", []):
-		lines.append(f"- {b}")
-
-	lines.append("\n## Situation Overview")
-	lines.append("```json")
-	lines.append(json.dumps(act.get("situation_overview", {}), ensure_ascii=False, indent=2))
-	lines.append("```")
-
-	lines.append("\n## Decision Intelligence (distributions & top severity)")
-	lines.append("```json")
-	lines.append(json.dumps(act.get("decision_intelligence", {}), ensure_ascii=False, indent=2))
-	lines.append("```")
-
-	lines.append("\n## Action Plan (next 4 hours)")
-	lines.append("```json")
-	lines.append(json.dumps(act.get("action_plan_next_4_hours", []), ensure_ascii=False, indent=2))
-	lines.append("```")
-
-	lines.append("\n## Comms Package")
-	lines.append("```json")
-	lines.append(json.dumps(act.get("comms_package", {}), ensure_ascii=False, indent=2))
-	lines.append("```")
-
-	lines.append("\n## Monitoring & Triggers")
-	lines.append("```json")
-	lines.append(json.dumps(act.get("monitoring_and_triggers", {}), ensure_ascii=False, indent=2))
-	lines.append("```")
-
-	lines.append("\n## Risks & Liability")
-	lines.append("```json")
-	lines.append(json.dumps(act.get("risks_and_liability", {}), ensure_ascii=False, indent=2))
-	lines.append("```")
+		w(f"- {b}\n")
+
+	json_block("\n## Situation Overview", act.get("situation_overview", {}))
+	json_block("\n## Decision Intelligence (distributions & top severity)", act.get("decision_intelligence", {}))
+	json_block("\n## Action Plan (next 4 hours)", act.get("action_plan_next_4_hours", []))
+	json_block("\n## Comms Package", act.get("comms_package", {}))
+	json_block("\n## Monitoring & Triggers", act.get("monitoring_and_triggers", {}))
+	json_block("\n## Risks & Liability", act.get("risks_and_liability", {}))
 
 	# --- Annex: STATS
-	lines.append("\n# Annex A — Computed Stats")
-	lines.append("```json")
-	lines.append(json.dumps(stats, ensure_ascii=False, indent=2))
-	lines.append("```")
+	json_block("\n# Annex A — Computed Stats", stats)
 
 	# --- Annex: ITEMS (full list)
-	lines.append("\n# Annex B — Items Used (full)")
-	lines.append("| decide_id | intent | urgency | severity | title | url |")
-	lines.append("|---:|---|---|---:|---|---|")
+	w("\n# Annex B — Items Used (full)\n")
+	w("| decide_id | intent | urgency | severity | title | url |\n")
+	w("|---:|---|---|---:|---|---|")
 	for it in items:
-		lines.append(
-			f"| {it.get('decide_id')} | {it.get('intent_framing')} | {it.get('urgency')} | {it.get('severity')} | "
-			f"{(it.get('title') or '').replace('|',' ')} | {(it.get('url') or '')} |"
+		get = it.get
+		w(
+			f"\n| {get('decide_id')} | {get('intent_framing')} | {get('urgency')} | {get('severity')} | "
+			f"{(get('title') or '').replace('|',' ')} | {(get('url') or '')} |"
 		)
 
-	return "\n".join(lines)
+	return buf.getvalue()
+
+
+REPORT_HEADERS = [
+	"published_at",
+	"title",
+	"url",
+	"severity",
+	"intent_framing",
+	"urgency",
+	"narrative_category",
+	"reputational_risk",
+	"recommended_action",
+	"snippet",
+]
+REPORT_WIDTHS = [18, 60, 60, 10, 14, 10, 18, 20, 35, 80]
 
 
 def write_act_excel(path_xlsx: str, items: List[Dict]) -> None:
-	wb = Workbook()
-	ws = wb.active
-	ws.title = "REPORT"
-
-	headers = [
-		"published_at",
-		"title",
-		"url",
-		"severity",
-		"intent_framing",
-		"urgency",
-		"narrative_category",
-		"reputational_risk",
-		"recommended_action",
-		"snippet",
-	]
-	ws.append(headers)
-
-	for cell in ws[1]:
-		cell.font = Font(bold=True)
+	from openpyxl import Workbook
+	from openpyxl.cell import WriteOnlyCell
+	from openpyxl.styles import Alignment, Font
+	from openpyxl.utils import get_column_letter
+
+	# write-only workbook: rows are streamed to disk, styles set at cell creation
+	wb = Workbook(write_only=True)
+	ws = wb.create_sheet("REPORT")
+
+	# shared style objects (deduplicated by openpyxl)
+	header_font = Font(bold=True)
+	link_font = Font(color="0000FF", underline="single")
+	wrap = Alignment(wrap_text=True, vertical="top")
+
+	# column widths must be set before the first append
+	for i, w in enumerate(REPORT_WIDTHS, start=1):
+		ws.column_dimensions[get_column_letter(i)].width = w
 
+	header = []
+	for h in REPORT_HEADERS:
+		cell = WriteOnlyCell(ws, value=h)
+		cell.font = header_font
+		header.append(cell)
+	ws.append(header)
+
+	url_col = REPORT_HEADERS.index("url")
 	for it in items:
-		ws.append([
-			it.get("published_at"),
-			it.get("title"),
-			it.get("url"),
-			it.get("severity"),
-			it.get("intent_framing"),
-			it.get("urgency"),
-			it.get("narrative_category"),
-			it.get("reputational_risk"),
-			it.get("recommended_action"),
-			it.get("snippet"),
-		])
-
-	for r in range(2, ws.max_row + 1):
-		url_cell = ws.cell(row=r, column=3)
-		if url_cell.value:
-			url_cell.hyperlink = url_cell.value
-			url_cell.font = Font(color="0000FF", underline="single")
-
-	widths = [18, 60, 60, 10, 14, 10, 18, 20, 35, 80]
-	for i, w in enumerate(widths, start=1):
-		ws.column_dimensions[get_column_letter(i)].width = w
-	for row_cells in ws.iter_rows(min_row=2):
-		for c in row_cells:
-			c.alignment = Alignment(wrap_text=True, vertical="top")
+		row = []
+		for i, key in enumerate(REPORT_HEADERS):
+			cell = WriteOnlyCell(ws, value=it.get(key))
+			cell.alignment = wrap
+			if i == url_col and cell.value:
+				cell.hyperlink = cell.value
+				cell.font = link_font
+			row.append(cell)
+		ws.append(row)
 
 	wb.save(path_xlsx)
 	print("Excel report saved:", path_xlsx)
 
 
+def save_act_run(db_path: str, brand: str, blob: str) -> None:
+	conn = get_conn(db_path)
+	ensure_act_table(conn)
+	cur = conn.cursor()
+	cur.execute(
+		"INSERT INTO runs_act (brand, act_json) VALUES (?, ?)",
+		(brand, blob),
+	)
+	conn.commit()
+	conn.close()
+
+
+def write_act_json(path_json: str, blob: str) -> None:
+	with open(path_json, "w", encoding="utf-8") as f:
+		f.write(blob)
+
+
 def main():
+	from llm import get_client, stream_text
+
 	load_dotenv()
 	api_key = os.getenv("OPENAI_API_KEY", "").strip()
 	if not api_key:
 		raise RuntimeError("Missing OPENAI_API_KEY in .env")
 
-	client = OpenAI(api_key=api_key)
+	client = get_client(api_key)
 
-	with open("config.yaml", "r", encoding="utf-8") as f:
-		cfg = yaml.safe_load(f)
+	cfg = get_config()
 
 	brand = get_brand(cfg)
 	db_path = cfg["storage"]["db_path"]
@@ -464,17 +561,33 @@ def main():
 
 	stats = compute_stats(items)
 
-	# ACT via LLM (aggregated)
-	prompt = build_act_prompt(brand, stats, items)
-
-	resp = client.chat.completions.create(
+	# ACT "map": una action card per item (max 12), in parallelo sullo stesso client
+	compact_items = [compact_item(it) for it in items[:12]]
+	item_actions = []
+	max_workers = max(1, min(12, len(compact_items)))
+	with ThreadPoolExecutor(max_workers=max_workers) as ex:
+		futures = [(ex.submit(act_item, client, brand, it), it) for it in compact_items]
+		# results collected in compact_items order (not completion order): the reduce prompt is
+		# identical run to run for the same items, so its prefix stays cacheable
+		for fut, it in futures:
+			try:
+				item_actions.append(fut.result())
+			except Exception as e:
+				print("FAILED ACT item:", it.get("title"))
+				print("ERROR:", repr(e))
+
+	# ACT "reduce": pacchetto aggregato da stats + action card
+	prompt = build_act_reduce_prompt(brand, stats, item_actions)
+
+	text = stream_text(
+		client,
 		model=MODEL,
 		messages=[{"role": "user", "content": prompt}],
 		response_format={"type": "json_object"},
 		timeout=90,
 	)
 
-	act_core = json.loads(resp.choices[0].message.content)
+	act_core = _loads(text)
 
 	# Build FULL payload (core + annex data)
 	ts = datetime.now().strftime("%Y%m%d_%H%M%S")
@@ -491,17 +604,6 @@ def main():
 		},
 	}
 
-	# Save to DB
-	conn = get_conn(db_path)
-	ensure_act_table(conn)
-	cur = conn.cursor()
-	cur.execute(
-		"INSERT INTO runs_act (brand, act_json) VALUES (?, ?)",
-		(brand, json.dumps(full, ensure_ascii=False)),
-	)
-	conn.commit()
-	conn.close()
-
 	# Save outputs
 	out_dir = os.getenv("RUN_DIR", "outputs")
 	os.makedirs(out_dir, exist_ok=True)
@@ -513,10 +615,18 @@ def main():
 		f"AI brand reputation monitoring report {date_tag}.xlsx"
 	)
 
-	with open(out_json, "w", encoding="utf-8") as f:
-		json.dump(full, f, ensure_ascii=False, indent=2)
-
-	write_act_excel(out_xlsx, items)
+	# serialize the full payload once: same text goes to DB and to disk
+	blob = _dumps_pretty(full)
+
+	# DB insert, JSON dump and Excel build are independent: overlap them
+	with ThreadPoolExecutor(max_workers=3) as ex:
+		futures = [
+			ex.submit(save_act_run, db_path, brand, blob),
+			ex.submit(write_act_json, out_json, blob),
+			ex.submit(write_act_excel, out_xlsx, items),
+		]
+		for fut in futures:
+			fut.result()  # re-raise failures
 
 	print("ACT FULL saved:")
 	print("-", out_json)
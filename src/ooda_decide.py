@@ -2,12 +2,29 @@ import json
 import os
 from typing import Dict, List, Optional
 
-import yaml
 from dotenv import load_dotenv
 from openai import OpenAI
 from openai import APIError, AuthenticationError, RateLimitError
 
-from db import get_conn
+from config import get_brand, get_config
+from db import get_conn, published_cutoff
+from llm import canonical_prompt, chat_completion, get_client, sdk_retrying
+from llm_cache import cache_key, ensure_cache_table, get_many, put_many
+from openai_batch import run_batch, use_batch_api
+from ooda_orient import ensure_orient_severity
+
+try:
+	import orjson
+	_loads = orjson.loads
+
+	def _dumps(obj) -> str:
+		# DB writes: compact, stable key order
+		return orjson.dumps(obj, option=orjson.OPT_SORT_KEYS).decode("utf-8")
+except ImportError:
+	_loads = json.loads  # optional speed-up only
+
+	def _dumps(obj) -> str:
+		return json.dumps(obj, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
 
 # Modello "cheap demo"
 MODEL = "gpt-5-mini"
@@ -17,10 +34,6 @@ INTENT_ENUM = ["THREAT", "DEFENSE", "NEUTRAL", "OPPORTUNITY", "NOISE"]
 FACT_CHECK_ENUM = ["verified", "disinformation", "uncertain"]
 
 
-def get_brand(cfg: Dict) -> str:
-	return os.getenv("BRAND", cfg.get("project", {}).get("brand", "")).strip()
-
-
 def ensure_decide_table(conn) -> None:
 	cur = conn.cursor()
 	cur.execute("""
@@ -33,17 +46,22 @@ def ensure_decide_table(conn) -> None:
 		created_at TEXT NOT NULL DEFAULT (datetime('now'))
 	)
 	""")
+	cur.execute("CREATE INDEX IF NOT EXISTS idx_items_decide_orient ON items_decide(orient_id)")
 	conn.commit()
+	ensure_orient_severity(conn)
 
 
-def fetch_recent_orient_with_raw(db_path: str, brand: str, limit: int = 20) -> List[Dict]:
+def fetch_recent_orient_with_raw(db_path: str, brand: str, limit: int = 20, skip_decided: bool = False) -> List[Dict]:
 	"""
 	Prende gli ultimi orient (max 30) entro 7 giorni, arricchiti con title/url/snippet da items_raw.
+	skip_decided: anti-join on items_decide (idx_items_decide_orient), only rows without a decision.
 	"""
 	conn = get_conn(db_path)
 	cur = conn.cursor()
 
-	cur.execute("""
+	decided_join = "LEFT JOIN items_decide d ON d.orient_id = o.id" if skip_decided else ""
+	decided_filter = "AND d.id IS NULL" if skip_decided else ""
+	cur.execute(f"""
 		SELECT
 			o.id AS orient_id,
 			o.raw_item_id AS raw_item_id,
@@ -51,78 +69,38 @@ def fetch_recent_orient_with_raw(db_path: str, brand: str, limit: int = 20) -> L
 			o.created_at AS orient_created_at,
 			r.title AS title,
 			r.url AS url,
-			r.content AS content,
-			r.metadata_json AS raw_metadata_json
+			r.content AS content
 		FROM items_orient o
 		LEFT JOIN items_raw r
 			ON r.id = o.raw_item_id
-		WHERE r.published_at >= datetime('now','-7 days')
+		{decided_join}
+		WHERE r.published_at >= ?
 		AND o.brand = ?
-		ORDER BY COALESCE(CAST(json_extract(o.orient_json, '$.severity') AS REAL), 0) DESC, o.id DESC
+		{decided_filter}
+		ORDER BY o.severity DESC, o.id DESC
 		LIMIT ?
-	""", (brand, limit))
+	""", (published_cutoff(7), brand, limit))
 
 	rows = [dict(r) for r in cur.fetchall()]
 	conn.close()
 	return rows
 
 
-def already_decided(conn, orient_id: int) -> bool:
-	cur = conn.cursor()
-	cur.execute("SELECT 1 FROM items_decide WHERE orient_id=? LIMIT 1", (orient_id,))
-	return cur.fetchone() is not None
-
-
 def api_smoke_test(client: OpenAI, brand: str) -> None:
-	resp = client.chat.completions.create(
-		model=MODEL,
-		messages=[{"role": "user", "content": f'Reply with a JSON object {{"ok": true, "brand": "{brand}"}}'}],
-		response_format={"type": "json_object"},
-		timeout=30,
-	)
+	# GET /models: validates key + network, no tokens billed
+	sdk_retrying(client).models.list(timeout=30)
 	print("API smoke test OK for brand:", brand)
 
 
-def build_decide_prompt(brand: str, raw: Dict, orient: Dict) -> str:
-	"""
-	DECIDE: deve capire l'INTENTO dell'articolo:
-	- THREAT: brand accusato / colpevole / scandalo
-	- DEFENSE: enforcement/azioni contro il fake, brand vittima o parte della soluzione
-	- OPPORTUNITY: news positiva (acquisizione, premio, partnership)
-	- NEUTRAL: citazione informativa
-	- NOISE: gossip/irrilevante
-
-	E poi dare azione coerente (no escalation inutile).
-	"""
-	title = (raw.get("title") or "").strip()
-	snippet = (raw.get("content") or "").strip()
-	url = (raw.get("url") or "").strip()
-
-	claim_summary = orient.get("claim_summary", "")
-	narr_cat = orient.get("narrative_category", "")
-	sev = orient.get("severity", 0)
-	rep_risk = orient.get("reputational_risk", "")
-
-	return f"""
+# static instructions first, byte-identical on every call: OpenAI automatic prompt caching
+# reuses the prefix, only the trailing user message changes
+DECIDE_SYSTEM_PROMPT = canonical_prompt("""
 ROLE: You are the DECIDE module of an OODA Loop AI early-warning system for brand reputation monitoring.
 
 FRAMEWORK CONSTRAINT:
 - This is DECIDE only: choose intent_framing + urgency + escalation_team + recommended_action + no_regret_move.
 - Do NOT write generic consultancy. Do NOT invent facts. Use ONLY the provided inputs (Title/Snippet/URL + ORIENT fields).
 
-BRAND: {brand}
-
-INPUTS (from ORIENT):
-- claim_summary: {claim_summary}
-- narrative_category: {narr_cat}
-- reputational_risk: {rep_risk}
-- severity: {sev}
-
-NEWS ITEM:
-- Title: {title}
-- Snippet: {snippet}
-- URL: {url}
-
 TASK:
 1) Interpret the INTENT / FRAMING of the article toward the brand.
 2) Select exactly ONE intent_framing label.
@@ -157,7 +135,7 @@ ESCALATION TEAM RULES:
 
 OUTPUT FORMAT:
 Return ONLY valid JSON with EXACTLY these fields:
-{{
+{
   "intent_framing": "THREAT|DEFENSE|OPPORTUNITY|NEUTRAL|NOISE",
   "recommended_action": "one sentence, specific and proportional",
   "urgency": "low|medium|high",
@@ -166,28 +144,87 @@ Return ONLY valid JSON with EXACTLY these fields:
   "no_regret_move": "one concrete step that is safe in most cases",
   "fact_check_status": "verified|disinformation|uncertain",
   "fact_check_rationale": "1-2 sentences explaining why the status was chosen, based on snippet/title only"
-}}
+}
 
 QUALITY CHECK BEFORE FINAL:
 - escalation_team must be an array (can be empty []).
 - rationale must explain why NOT escalating if DEFENSE/NEUTRAL/NOISE.
 - Keep actions proportional and avoid unnecessary legal escalation if enforcement already happened.
 
-""".strip()
+""")
 
 
-def decide_one(client: OpenAI, brand: str, raw: Dict, orient: Dict) -> Dict:
-	prompt = build_decide_prompt(brand, raw, orient)
+def build_decide_user_prompt(brand: str, raw: Dict, orient: Dict) -> str:
+	"""
+	DECIDE: deve capire l'INTENTO dell'articolo:
+	- THREAT: brand accusato / colpevole / scandalo
+	- DEFENSE: enforcement/azioni contro il fake, brand vittima o parte della soluzione
+	- OPPORTUNITY: news positiva (acquisizione, premio, partnership)
+	- NEUTRAL: citazione informativa
+	- NOISE: gossip/irrilevante
 
-	resp = client.chat.completions.create(
-		model=MODEL,
-		messages=[{"role": "user", "content": prompt}],
-		response_format={"type": "json_object"},
-		timeout=45,
-	)
+	E poi dare azione coerente (no escalation inutile).
+	Qui solo la parte variabile (BRAND / INPUTS / NEWS ITEM): regole e schema stanno in DECIDE_SYSTEM_PROMPT.
+	"""
+	title = (raw.get("title") or "").strip()
+	snippet = (raw.get("content") or "").strip()
+	url = (raw.get("url") or "").strip()
+
+	claim_summary = orient.get("claim_summary", "")
+	narr_cat = orient.get("narrative_category", "")
+	sev = orient.get("severity", 0)
+	rep_risk = orient.get("reputational_risk", "")
+
+	return canonical_prompt(f"""
+BRAND: {brand}
+
+INPUTS (from ORIENT):
+- claim_summary: {claim_summary}
+- narrative_category: {narr_cat}
+- reputational_risk: {rep_risk}
+- severity: {sev}
+
+NEWS ITEM:
+- Title: {title}
+- Snippet: {snippet}
+- URL: {url}
+
+""")
+
+
+# brand relevance pre-filter: brand name not in title/url/content -> NOISE without an LLM call
+OFF_BRAND_DECISION = {
+	"intent_framing": "NOISE",
+	"recommended_action": "No action: not about the brand.",
+	"urgency": "low",
+	"escalation_team": [],
+	"rationale": "Excluded: content does not reference the brand; treated as unrelated homonym/noise.",
+	"no_regret_move": "Monitor briefly for any brand-specific mention.",
+}
+
+
+def decide_request(brand: str, raw: Dict, orient: Dict) -> Dict:
+	"""
+	chat.completions body for one DECIDE call (shared by the realtime call and the Batch API).
+	"""
+	return {
+		"model": MODEL,
+		"messages": [
+			{"role": "system", "content": DECIDE_SYSTEM_PROMPT},
+			{"role": "user", "content": build_decide_user_prompt(brand, raw, orient)},
+		],
+		"response_format": {"type": "json_object"},
+	}
 
-	obj = json.loads(resp.choices[0].message.content)
 
+def decide_one(client: OpenAI, brand: str, raw: Dict, orient: Dict) -> Dict:
+	# full object, parsed like the Batch API results: the model's own rationale and
+	# fact_check_status (disinformation -> THREAT) are always kept
+	resp = chat_completion(client, timeout=45, **decide_request(brand, raw, orient))
+	return normalize_decision(_loads(resp.choices[0].message.content))
+
+
+def normalize_decision(obj: Dict) -> Dict:
 	# Hard validation / normalization (evita output fuori enum)
 	intent = str(obj.get("intent_framing", "")).strip().upper()
 	if intent not in INTENT_ENUM:
@@ -224,56 +261,55 @@ def main():
 	if not api_key:
 		raise RuntimeError("Missing OPENAI_API_KEY in .env")
 
-	client = OpenAI(api_key=api_key)
+	client = get_client(api_key)
 
-	with open("config.yaml", "r", encoding="utf-8") as f:
-		cfg = yaml.safe_load(f)
+	cfg = get_config()
 
 	brand = get_brand(cfg)
 	db_path = cfg["storage"]["db_path"]
 
-	# Smoke test (così capisci subito se rete/key ok)
-	try:
-		api_smoke_test(client, brand)
-	except AuthenticationError:
-		print("AUTH ERROR: OPENAI_API_KEY invalid/missing permissions.")
-		raise
-	except RateLimitError:
-		print("RATE LIMIT / QUOTA: check billing/credits.")
-		raise
-	except APIError as e:
-		print("OPENAI API ERROR:", str(e))
-		raise
-
-	records = fetch_recent_orient_with_raw(db_path, brand, limit=20)
+	# Smoke test (così capisci subito se rete/key ok); OODA_SKIP_SMOKE=1 saves the extra round-trip
+	if not os.getenv("OODA_SKIP_SMOKE", "").strip():
+		try:
+			api_smoke_test(client, brand)
+		except AuthenticationError:
+			print("AUTH ERROR: OPENAI_API_KEY invalid/missing permissions.")
+			raise
+		except RateLimitError:
+			print("RATE LIMIT / QUOTA: check billing/credits.")
+			raise
+		except APIError as e:
+			print("OPENAI API ERROR:", str(e))
+			raise
+
+	conn = get_conn(db_path)
+	ensure_decide_table(conn)  # also materializes items_orient.severity used by the fetch below
+
+	# già decisi esclusi direttamente dalla query (anti-join): nessuna chiamata inutile
+	records = fetch_recent_orient_with_raw(db_path, brand, limit=20, skip_decided=True)
 	if not records:
-		print("No ORIENT records found. Run ORIENT first.")
+		print("No undecided ORIENT records found. Run ORIENT first.")
+		conn.close()
 		return
 
-	conn = get_conn(db_path)
-	ensure_decide_table(conn)
 	cur = conn.cursor()
 
-	done = 0
-	skipped = 0
+	noise_rows = []
+	off_brand_json = _dumps(OFF_BRAND_DECISION)
 
 	print(f"\nRunning DECIDE for brand: {brand}")
 	print(f"Scanning last {len(records)} ORIENT items...\n")
 
 	brand_lower = brand.lower()
 
-	# Pre-filtra ciò che è già deciso per evitare chiamate inutili
 	to_process = []
 	for rec in records:
 		orient_id = rec.get("orient_id")
 		raw_item_id = rec.get("raw_item_id")
 		if orient_id is None or raw_item_id is None:
 			continue
-		if already_decided(conn, int(orient_id)):
-			skipped += 1
-			continue
 		try:
-			orient = json.loads(rec.get("orient_json") or "{}")
+			orient = _loads(rec.get("orient_json") or "{}")
 		except Exception:
 			orient = {}
 		raw = {
@@ -283,52 +319,84 @@ def main():
 		}
 
 		# Brand relevance check: skip homonyms / unrelated mentions
-		text_join = " ".join([raw.get("title") or "", raw.get("content") or "", raw.get("url") or ""]).lower()
-		if brand_lower and brand_lower not in text_join:
-			decide = {
-				"intent_framing": "NOISE",
-				"recommended_action": "No action: not about the brand.",
-				"urgency": "low",
-				"escalation_team": [],
-				"rationale": "Excluded: content does not reference the brand; treated as unrelated homonym/noise.",
-				"no_regret_move": "Monitor briefly for any brand-specific mention.",
-			}
-			cur.execute("""
-				INSERT INTO items_decide (raw_item_id, orient_id, brand, decide_json)
-				VALUES (?, ?, ?, ?)
-			""", (int(raw_item_id), int(orient_id), brand, json.dumps(decide, ensure_ascii=False)))
-			skipped += 1
+		# (short-circuits on title/url before lowercasing the long content; no joined copy)
+		if brand_lower and not any(
+			brand_lower in (raw.get(key) or "").lower() for key in ("title", "url", "content")
+		):
+			# collected, written with the LLM results in the single executemany below
+			noise_rows.append((int(raw_item_id), int(orient_id), brand, off_brand_json))
 			continue
 
-		to_process.append((orient_id, raw_item_id, raw, orient))
+		key = cache_key(decide_request(brand, raw, orient))
+		to_process.append((orient_id, raw_item_id, raw, orient, key))
 
-	# Decidi in parallelo (fino a ~30 worker)
 	results = []
+	fresh = []  # (cache key, decision) answered by the API in this run
+
+	# LLM response cache: same prompts + model already answered -> no API call
+	ensure_cache_table(conn)
+	cached = get_many(conn, [key for *_, key in to_process])
+	pending = []
+	for (orient_id, raw_item_id, raw, orient, key) in to_process:
+		hit = cached.get(key)
+		if hit is None:
+			pending.append((orient_id, raw_item_id, raw, orient, key))
+			continue
+		results.append((orient_id, raw_item_id, raw, normalize_decision(_loads(hit))))
+	cache_hits = len(to_process) - len(pending)
+	to_process = pending
+
+	if use_batch_api():
+		# Batch API: one JSONL request per record, custom_id maps the answer back to orient_id
+		contents = run_batch(client, {
+			f"decide:{orient_id}": decide_request(brand, raw, orient)
+			for (orient_id, raw_item_id, raw, orient, key) in to_process
+		})
+		for (orient_id, raw_item_id, raw, orient, key) in to_process:
+			content = contents.get(f"decide:{orient_id}")
+			try:
+				if content is None:
+					raise RuntimeError("missing batch result")
+				decide = normalize_decision(_loads(content))
+				results.append((orient_id, raw_item_id, raw, decide))
+				fresh.append((key, decide))
+			except Exception as e:
+				print("FAILED DECIDE on:", raw.get("title"))
+				print("ERROR:", repr(e))
+		to_process = []  # nothing left for the realtime path
+
+	# Decidi in parallelo (fino a ~30 worker)
 	max_workers = max(1, min(30, len(to_process)))
 	from concurrent.futures import ThreadPoolExecutor, as_completed
 	with ThreadPoolExecutor(max_workers=max_workers) as ex:
 		futures = {
-			ex.submit(decide_one, client, brand, raw, orient): (orient_id, raw_item_id, raw)
-			for (orient_id, raw_item_id, raw, orient) in to_process
+			ex.submit(decide_one, client, brand, raw, orient): (orient_id, raw_item_id, raw, key)
+			for (orient_id, raw_item_id, raw, orient, key) in to_process
 		}
 		for fut in as_completed(futures):
-			orient_id, raw_item_id, raw = futures[fut]
+			orient_id, raw_item_id, raw, key = futures[fut]
 			try:
 				decide = fut.result()
 				results.append((orient_id, raw_item_id, raw, decide))
+				fresh.append((key, decide))
 			except Exception as e:
 				print("FAILED DECIDE on:", raw.get("title"))
 				print("ERROR:", repr(e))
 
-	# Inserimento sequenziale (evita write race sul DB)
-	for orient_id, raw_item_id, raw, decide in results:
-		cur.execute("""
-			INSERT INTO items_decide (raw_item_id, orient_id, brand, decide_json)
-			VALUES (?, ?, ?, ?)
-		""", (int(raw_item_id), int(orient_id), brand, json.dumps(decide, ensure_ascii=False)))
-
-		done += 1
+	# Inserimento sequenziale (evita write race sul DB): un solo executemany (off-brand + LLM)
+	cur.executemany("""
+		INSERT INTO items_decide (raw_item_id, orient_id, brand, decide_json)
+		VALUES (?, ?, ?, ?)
+	""", noise_rows + [
+		(int(raw_item_id), int(orient_id), brand, _dumps(decide))
+		for orient_id, raw_item_id, raw, decide in results
+	])
+	put_many(conn, [(key, MODEL, _dumps(decide)) for key, decide in fresh])
+	conn.commit()
+	conn.close()
+	done = len(results)
 
+	for orient_id, raw_item_id, raw, decide in results:
 		print("----")
 		print(raw.get("title"))
 		print("intent:", decide.get("intent_framing"), "| urgency:", decide.get("urgency"))
@@ -336,11 +404,8 @@ def main():
 		print("team:", decide.get("escalation_team"))
 		print()
 
-	conn.commit()
-	conn.close()
-
 	print(f"Done. DECIDE saved to DB table: items_decide")
-	print(f"New decisions: {done} | skipped (already decided): {skipped}")
+	print(f"New decisions: {done} (from cache: {cache_hits}) | skipped (not about the brand): {len(noise_rows)}")
 
 
 if __name__ == "__main__":
@@ -1,68 +1,161 @@
 import json
 import os
 from datetime import datetime
-from typing import Dict, List
+from typing import Dict, Iterable, Iterator, List
 from concurrent.futures import ThreadPoolExecutor, as_completed
 
-import yaml
 from dotenv import load_dotenv
 from openai import OpenAI
 from openai import APIError, AuthenticationError, RateLimitError
-from db import get_conn
+from config import get_brand, get_config
+from db import get_conn, is_remote, iter_rows
+from llm import canonical_prompt, chat_completion, get_client, sdk_retrying
+from llm_cache import cache_key, ensure_cache_table, get_many, put_many
+from openai_batch import run_batch, use_batch_api
+from semantic_cache import ensure_embeddings_table, find_near_duplicates, use_semantic_cache
+
+try:
+	import orjson
+	_loads = orjson.loads
+
+	def _dumps(obj) -> str:
+		# DB writes: compact, stable key order
+		return orjson.dumps(obj, option=orjson.OPT_SORT_KEYS).decode("utf-8")
+except ImportError:
+	_loads = json.loads  # optional speed-up only
+
+	def _dumps(obj) -> str:
+		return json.dumps(obj, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
 
 MODEL = "gpt-5-mini"  # economico
+SNIPPET_CHARS = 1000  # content sent per item (trimmed already in SQL)
+BATCH_TOKEN_BUDGET = 8000  # estimated input tokens per ORIENT call (items only, system prefix excluded)
+BATCH_MAX_ITEMS = 25  # keeps the JSON answer (one object per item) well within output limits
 
 
-def get_brand(cfg: Dict) -> str:
-	return os.getenv("BRAND", cfg.get("project", {}).get("brand", "")).strip()
+def _title_norm(title) -> str:
+	# same story across outlets: lowercase, strip trailing " - Source"
+	title_norm = (title or "").strip().lower()
+	if " - " in title_norm:
+		title_norm = title_norm.rsplit(" - ", 1)[0]
+	return title_norm
 
 
-def fetch_latest_items(db_path: str, limit: int = 0) -> List[Dict]:
+def fetch_latest_items(db_path: str, limit: int = 0) -> Iterator[Dict]:
+	"""
+	Raw items not yet oriented, deduped by normalized title (most recent kept) inside the DB:
+	only the surviving rows are transferred to Python, streamed (iter_rows) and trimmed to
+	the columns / lengths ORIENT actually sends.
+	"""
 	conn = get_conn(db_path)
-	cur = conn.cursor()
-	sql = """
-		SELECT r.id, r.title, r.url, r.content, r.metadata_json, r.brand
-		FROM items_raw r
-		LEFT JOIN items_orient o ON o.raw_item_id = r.id
-		WHERE o.id IS NULL
-		ORDER BY r.id DESC
+	if is_remote():
+		# greedy (.*) -> cut at the last " - ", like rsplit(" - ", 1)
+		tnorm = r"regexp_replace(lower(btrim(COALESCE(r.title, ''))), '^(.*) - .*$', '\1')"
+	else:
+		conn.create_function("title_norm", 1, _title_norm, deterministic=True)
+		tnorm = "title_norm(r.title)"
+	sql = f"""
+		WITH c AS (
+			SELECT r.id, r.title, r.url, SUBSTR(r.content, 1, {SNIPPET_CHARS}) AS content, r.brand,
+				ROW_NUMBER() OVER (PARTITION BY {tnorm} ORDER BY r.id DESC) AS rn
+			FROM items_raw r
+			LEFT JOIN items_orient o ON o.raw_item_id = r.id
+			WHERE o.id IS NULL
+		)
+		SELECT id, title, url, content, brand
+		FROM c
+		WHERE rn = 1
+		ORDER BY id DESC
 	"""
+	params = ()
 	if limit and limit > 0:
 		sql += " LIMIT ?"
-		cur.execute(sql, (limit,))
-	else:
-		cur.execute(sql)
-	rows_raw = [dict(r) for r in cur.fetchall()]
-	conn.close()
-	# Dedup by normalized title (keep most recent first because ordered DESC)
-	seen = set()
-	rows = []
-	for r in rows_raw:
-		title_raw = (r.get("title") or "").strip()
-		title_norm = title_raw.lower()
-		# try to strip trailing " - Source" to dedup same story across outlets
-		if " - " in title_norm:
-			title_norm = title_norm.rsplit(" - ", 1)[0]
-		if title_norm in seen:
-			continue
-		seen.add(title_norm)
-		rows.append(r)
-	return rows
+		params = (limit,)
+	try:
+		for r in iter_rows(conn, sql, params):
+			yield dict(r)
+	finally:
+		conn.close()
+
+
+def _est_tokens(item: Dict) -> int:
+	# ~4 chars per token on what orient_request actually sends
+	return (min(len(item.get("title") or ""), 500) + min(len(item.get("content") or ""), SNIPPET_CHARS)) // 4
+
+
+def pack_batches(rows: Iterable[Dict], budget: int = BATCH_TOKEN_BUDGET, max_items: int = BATCH_MAX_ITEMS) -> List[List[Dict]]:
+	"""
+	Greedy token packing: longest items first, a batch closes when the input-token budget
+	(or max_items) would be exceeded. Fewer, evenly sized calls; no long straggler at the end.
+	"""
+	batches = []
+	current = []
+	used = 0
+	for item in sorted(rows, key=_est_tokens, reverse=True):
+		cost = _est_tokens(item)
+		if current and (used + cost > budget or len(current) >= max_items):
+			batches.append(current)
+			current = []
+			used = 0
+		current.append(item)
+		used += cost
+	if current:
+		batches.append(current)
+	return batches
 
 
 def api_smoke_test(client: OpenAI, brand: str) -> None:
-	# test minimo: una completion piccola
-	resp = client.chat.completions.create(
-		model=MODEL,
-		messages=[{"role": "user", "content": "Reply with a JSON object {\"ok\": true}"}],
-		response_format={"type": "json_object"},
-	)
+	# test minimo: GET /models valida key + rete senza consumare token
+	sdk_retrying(client).models.list(timeout=30)
 	print(f"API smoke test OK for brand: {brand}")
 
 
-def orient_batch(client: OpenAI, brand: str, batch: List[Dict]) -> List[Dict]:
+# static part (instructions + schema) as a byte-identical system message: OpenAI automatic
+# prompt caching reuses this prefix across batches, only brand/items change per call
+ORIENT_INSTRUCTION = "\n".join([
+	"ROLE: You are the ORIENT module of an OODA Loop early-warning system for brand reputation monitoring.",
+	"GOAL: Transform noisy media items into structured situational awareness for the next DECIDE step.",
+	"SCOPE: Use ONLY the provided title/snippet/url. Do NOT use external knowledge, browsing, or assumptions about the brand.",
+	"OUTPUT: Return ONLY valid JSON with top-level key 'items' as an array. No prose.",
+	"FRAMEWORK FIDELITY (OODA): This is ORIENT only. Do not propose actions, strategies, PR statements, or legal advice.",
+	"EVIDENCE RULES:",
+	"- Base the claim_summary on explicit statements in the snippet/title; do not invent facts.",
+	"- If the snippet does not contain a concrete claim about the brand, set narrative_category='other', reputational_risk='low', severity<=15, confidence<=0.4.",
+	"- If the item is clearly about other entities (not the brand), treat as noise: reputational_risk='low', severity<=10, confidence<=0.3, narrative_category='other'.",
+	"LABELING RULES:",
+	"- narrative_category must be one of: supply_chain|cultural_controversy|financial|fake_news|other.",
+	"- reputational_risk must be one of: low|medium|high.",
+	"- severity is an integer 0-100. confidence is 0-1 float.",
+	"VERIFICATION:",
+	"- verification_steps must be exactly 3 short bullets focused on how to verify the claim (e.g., check primary source, check official statement, cross-check reputable outlets).",
+	"CONSISTENCY:",
+	"- Higher severity requires higher confidence OR clear harm indicators; if confidence<0.5 keep severity<=50.",
+	"- If the snippet indicates the company already took action (e.g., seizure by authorities / enforcement already happened), do NOT escalate severity automatically; reflect it in claim_summary and keep verification focused.",
+])
+
+ORIENT_SCHEMA = {
+	"item_id": "int (echo input)",
+	"claim_summary": "string, 1 sentence",
+	"narrative_category": "supply_chain|cultural_controversy|financial|fake_news|other",
+	"reputational_risk": "low|medium|high",
+	"severity": "0-100",
+	"confidence": "0-1",
+	"verification_steps": "list of 3 bullets",
+}
+
+ORIENT_SYSTEM_PROMPT = canonical_prompt(
+	"Return ONLY JSON. Respond with a single JSON object containing key 'items'. "
+	"Do not add prose or explanations.\n\n"
+	+ ORIENT_INSTRUCTION
+	+ "\n\nSCHEMA (one object per item):\n"
+	+ json.dumps(ORIENT_SCHEMA, ensure_ascii=False, sort_keys=True)
+)
+
+
+def orient_request(brand: str, batch: List[Dict]) -> Dict:
 	"""
 	Batch more items in a single call; response keeps item_id to re-map.
+	Returns the chat.completions body (shared by the realtime call and the Batch API).
 	"""
 	parts = []
 	for item in batch:
@@ -70,65 +163,71 @@ def orient_batch(client: OpenAI, brand: str, batch: List[Dict]) -> List[Dict]:
 			{
 				"item_id": item["id"],
 				"title": (item.get("title") or "")[:500],
-				"snippet": (item.get("content") or "")[:1000],
+				"snippet": (item.get("content") or "")[:SNIPPET_CHARS],
 				"url": item.get("url") or "",
 			}
 		)
 
-	prompt = {
-		"instruction": "\n".join([
-			"ROLE: You are the ORIENT module of an OODA Loop early-warning system for brand reputation monitoring.",
-			"GOAL: Transform noisy media items into structured situational awareness for the next DECIDE step.",
-			"SCOPE: Use ONLY the provided title/snippet/url. Do NOT use external knowledge, browsing, or assumptions about the brand.",
-			"OUTPUT: Return ONLY valid JSON with top-level key 'items' as an array. No prose.",
-			"FRAMEWORK FIDELITY (OODA): This is ORIENT only. Do not propose actions, strategies, PR statements, or legal advice.",
-			"EVIDENCE RULES:",
-			"- Base the claim_summary on explicit statements in the snippet/title; do not invent facts.",
-			"- If the snippet does not contain a concrete claim about the brand, set narrative_category='other', reputational_risk='low', severity<=15, confidence<=0.4.",
-			"- If the item is clearly about other entities (not the brand), treat as noise: reputational_risk='low', severity<=10, confidence<=0.3, narrative_category='other'.",
-			"LABELING RULES:",
-			"- narrative_category must be one of: supply_chain|cultural_controversy|financial|fake_news|other.",
-			"- reputational_risk must be one of: low|medium|high.",
-			"- severity is an integer 0-100. confidence is 0-1 float.",
-			"VERIFICATION:",
-			"- verification_steps must be exactly 3 short bullets focused on how to verify the claim (e.g., check primary source, check official statement, cross-check reputable outlets).",
-			"CONSISTENCY:",
-			"- Higher severity requires higher confidence OR clear harm indicators; if confidence<0.5 keep severity<=50.",
-			"- If the snippet indicates the company already took action (e.g., seizure by authorities / enforcement already happened), do NOT escalate severity automatically; reflect it in claim_summary and keep verification focused.",
-		]),
-		"brand": brand,
-		"items": parts,
-		"schema": {
-			"item_id": "int (echo input)",
-			"claim_summary": "string, 1 sentence",
-			"narrative_category": "supply_chain|cultural_controversy|financial|fake_news|other",
-			"reputational_risk": "low|medium|high",
-			"severity": "0-100",
-			"confidence": "0-1",
-			"verification_steps": "list of 3 bullets",
-		},
+	prompt_text = json.dumps({"brand": brand, "items": parts}, ensure_ascii=False)
+
+	return {
+		"model": MODEL,
+		"messages": [
+			{"role": "system", "content": ORIENT_SYSTEM_PROMPT},
+			{"role": "user", "content": prompt_text},
+		],
+		"response_format": {"type": "json_object"},
 	}
 
-	prompt_text = json.dumps(prompt, ensure_ascii=False)
 
-	resp = client.chat.completions.create(
-		model=MODEL,
-		messages=[
-			{
-				"role": "user",
-				"content": (
-					"Return ONLY JSON. Respond with a single JSON object containing key 'items'. "
-					"Do not add prose or explanations.\n\n"
-					+ prompt_text
-				),
-			}
-		],
-		response_format={"type": "json_object"},
-		timeout=45,
-	)
+def parse_orient_items(content: str) -> List[Dict]:
+	payload = _loads(content)
+	items = payload.get("items", []) if isinstance(payload, dict) else None
+	if not isinstance(items, list):
+		raise ValueError(f"ORIENT payload without an items list: {content[:200]!r}")
+	return items
+
 
-	payload = json.loads(resp.choices[0].message.content)
-	return payload.get("items", [])
+def orient_batch(client: OpenAI, brand: str, batch: List[Dict]) -> List[Dict]:
+	resp = chat_completion(client, timeout=45, **orient_request(brand, batch))
+	return parse_orient_items(resp.choices[0].message.content)
+
+
+# severity materialized from orient_json (non-numeric / missing -> 0), so the
+# "top by severity" ORDER BY is an index scan instead of json parsing + sort
+ORIENT_SEVERITY_SQLITE = "COALESCE(CAST(json_extract(orient_json, '$.severity') AS REAL), 0)"
+ORIENT_SEVERITY_PG = (
+	"CASE WHEN (orient_json::json->>'severity') ~ '^-{0,1}[0-9]+([.][0-9]+){0,1}$' "
+	"THEN (orient_json::json->>'severity')::double precision ELSE 0 END"
+)
+
+
+def ensure_orient_severity(conn) -> None:
+	"""
+	Aggiunge (una volta) la colonna generata items_orient.severity + indice (brand, severity, id).
+	"""
+	cur = conn.cursor()
+	if is_remote():
+		cur.execute("SELECT to_regclass('items_orient') IS NOT NULL AS present")
+		if not cur.fetchone()["present"]:
+			return
+		cur.execute(
+			"ALTER TABLE items_orient ADD COLUMN IF NOT EXISTS severity DOUBLE PRECISION "
+			f"GENERATED ALWAYS AS ({ORIENT_SEVERITY_PG}) STORED"
+		)
+	else:
+		cols = {r["name"] for r in cur.execute("PRAGMA table_xinfo(items_orient)").fetchall()}
+		if not cols:
+			return
+		if "severity" not in cols:
+			# SQLite: ALTER TABLE can only add VIRTUAL generated columns (computed on read, indexable)
+			cur.execute(
+				f"ALTER TABLE items_orient ADD COLUMN severity REAL GENERATED ALWAYS AS ({ORIENT_SEVERITY_SQLITE}) VIRTUAL"
+			)
+	cur.execute(
+		"CREATE INDEX IF NOT EXISTS idx_items_orient_brand_severity ON items_orient(brand, severity DESC, id DESC)"
+	)
+	conn.commit()
 
 
 def main():
@@ -138,32 +237,30 @@ def main():
 	if not api_key:
 		raise RuntimeError("Missing OPENAI_API_KEY in .env")
 
-	client = OpenAI(api_key=api_key)
+	client = get_client(api_key)
 
-	with open("config.yaml", "r", encoding="utf-8") as f:
-		cfg = yaml.safe_load(f)
+	cfg = get_config()
 
 	db_path = cfg["storage"]["db_path"]
 	brand = get_brand(cfg) or "the brand"
-	items = fetch_latest_items(db_path, limit=0)  # 0 = no limit
+	items = list(fetch_latest_items(db_path, limit=0))  # 0 = no limit
 
-	# ✅ Smoke test per capire subito se key/model/rete sono ok
-	try:
-		api_smoke_test(client, brand)
-	except AuthenticationError as e:
-		print("\nAUTH ERROR: controlla OPENAI_API_KEY in .env")
-		raise
-	except RateLimitError as e:
-		print("\nRATE LIMIT / QUOTA: potresti non avere credito o hai superato limiti.")
-		raise
-	except APIError as e:
-		print("\nOPENAI API ERROR:", str(e))
-		raise
-	except Exception as e:
-		print("\nGENERIC ERROR during smoke test:", repr(e))
-		raise
-
-	print(f"\nRunning ORIENT on {len(items)} items (batched)...\n")
+	# ✅ Smoke test per capire subito se key/model/rete sono ok; OODA_SKIP_SMOKE=1 lo salta
+	if not os.getenv("OODA_SKIP_SMOKE", "").strip():
+		try:
+			api_smoke_test(client, brand)
+		except AuthenticationError as e:
+			print("\nAUTH ERROR: controlla OPENAI_API_KEY in .env")
+			raise
+		except RateLimitError as e:
+			print("\nRATE LIMIT / QUOTA: potresti non avere credito o hai superato limiti.")
+			raise
+		except APIError as e:
+			print("\nOPENAI API ERROR:", str(e))
+			raise
+		except Exception as e:
+			print("\nGENERIC ERROR during smoke test:", repr(e))
+			raise
 
 	conn = get_conn(db_path)
 	cur = conn.cursor()
@@ -176,19 +273,81 @@ def main():
 		created_at TEXT NOT NULL DEFAULT (datetime('now'))
 	)
 	""")
+	cur.execute("CREATE INDEX IF NOT EXISTS idx_items_orient_raw ON items_orient(raw_item_id)")
+	conn.commit()
+	ensure_orient_severity(conn)  # generated severity column + (brand, severity, id) index
 
-	chunk_size = 5
-	batches = [items[i:i + chunk_size] for i in range(0, len(items), chunk_size)]
+	rows = []
+
+	# semantic cache: a reworded republication of an already-oriented story (same brand,
+	# cosine >= 0.92 in the last 30 days) reuses that ORIENT verbatim; 1 embedding vs 1 chat call
+	if use_semantic_cache() and items:
+		ensure_embeddings_table(conn)
+		try:
+			reused = find_near_duplicates(client, conn, items)
+		except Exception as e:
+			print("\nSemantic cache skipped:", repr(e))
+			reused = {}
+		conn.commit()  # embeddings saved even if ORIENT fails later
+		if reused:
+			for item in items:
+				prev = reused.get(int(item["id"]))
+				if prev is None:
+					continue
+				orient = _loads(prev)
+				orient["item_id"] = item["id"]
+				rows.append((item["id"], item.get("brand", ""), _dumps(orient)))
+			items = [it for it in items if int(it["id"]) not in reused]
+			print(f"ORIENT semantic cache: {len(reused)} near-duplicate item(s) reused")
+
+	batches = pack_batches(items)
+	print(f"\nRunning ORIENT on {len(items)} items (batched)...\n")
 
 	results = []
-	max_workers = max(1, min(6, len(batches)))  # parallelize batches cautiously
+	fresh = []  # (cache key, items) answered by the API in this run
+
+	# LLM response cache: same chunk + prompts + model already answered -> no API call
+	ensure_cache_table(conn)
+	keyed = [(cache_key(orient_request(brand, batch)), batch) for batch in batches]
+	cached = get_many(conn, [key for key, _ in keyed])
+	pending = []
+	for key, batch in keyed:
+		hit = cached.get(key)
+		if hit is None:
+			pending.append((key, batch))
+		else:
+			results.append((batch, parse_orient_items(hit)))
+	if cached:
+		print(f"ORIENT cache hits: {len(keyed) - len(pending)} batch(es)")
+
+	if use_batch_api():
+		# Batch API: one JSONL request per chunk, custom_id maps the answer back
+		contents = run_batch(
+			client, {f"orient:{i}": orient_request(brand, batch) for i, (key, batch) in enumerate(pending)}
+		)
+		for i, (key, batch) in enumerate(pending):
+			content = contents.get(f"orient:{i}")
+			if content is None:
+				print("\nFAILED batch containing ids:", [it.get("id") for it in batch])
+				continue
+			try:
+				out_items = parse_orient_items(content)
+				results.append((batch, out_items))
+				fresh.append((key, out_items))
+			except Exception as e:
+				print("\nFAILED batch containing ids:", [it.get("id") for it in batch])
+				print("ERROR:", repr(e))
+		pending = []  # nothing left for the realtime path
+
+	max_workers = max(1, min(12, len(pending)))  # rate control is left to llm's semaphore/retry
 	with ThreadPoolExecutor(max_workers=max_workers) as ex:
-		futures = {ex.submit(orient_batch, client, brand, batch): batch for batch in batches}
+		futures = {ex.submit(orient_batch, client, brand, batch): (key, batch) for key, batch in pending}
 		for fut in as_completed(futures):
-			batch = futures[fut]
+			key, batch = futures[fut]
 			try:
 				out_items = fut.result()
 				results.append((batch, out_items))
+				fresh.append((key, out_items))
 			except Exception as e:
 				print("\nFAILED batch containing ids:", [it.get("id") for it in batch])
 				print("ERROR:", repr(e))
@@ -200,15 +359,18 @@ def main():
 			if item_id not in id_map:
 				continue
 			item = id_map[item_id]
-			cur.execute("""
-				INSERT INTO items_orient (raw_item_id, brand, orient_json)
-				VALUES (?, ?, ?)
-			""", (item["id"], item.get("brand", ""), json.dumps(orient, ensure_ascii=False)))
+			rows.append((item["id"], item.get("brand", ""), _dumps(orient)))
 
 			print("----")
 			print(item.get("title"))
 			print("->", orient.get("reputational_risk"), "| severity:", orient.get("severity"))
 
+	# one executemany + one commit (single transaction) for the whole INSERT burst
+	cur.executemany("""
+		INSERT INTO items_orient (raw_item_id, brand, orient_json)
+		VALUES (?, ?, ?)
+	""", rows)
+	put_many(conn, [(key, MODEL, _dumps({"items": out})) for key, out in fresh])
 	conn.commit()
 	conn.close()
 	print("\nDone. ORIENT outputs saved in DB table: items_orient")
@@ -0,0 +1,85 @@
+import io
+import json
+import os
+import time
+from typing import Dict
+
+from openai import OpenAI
+
+from llm import RETRYABLE_ERRORS, sdk_retrying
+
+BATCH_ENDPOINT = "/v1/chat/completions"
+TERMINAL_STATUSES = {"completed", "failed", "expired", "cancelled"}
+
+
+def use_batch_api() -> bool:
+	"""
+	OODA_BATCH=1 -> ORIENT/DECIDE go through the Batch API (50% cheaper, up to 24h latency).
+	Default off: the UI/orchestrator run is on-demand and waits for the report.
+	"""
+	return os.getenv("OODA_BATCH", "").strip().lower() in ("1", "true", "yes")
+
+
+def submit_batch(client: OpenAI, requests: Dict[str, Dict]) -> str:
+	"""
+	requests: custom_id -> chat.completions body (model/messages/response_format). Returns batch_id.
+	"""
+	lines = [
+		json.dumps({"custom_id": cid, "method": "POST", "url": BATCH_ENDPOINT, "body": body}, ensure_ascii=False)
+		for cid, body in requests.items()
+	]
+	data = ("\n".join(lines) + "\n").encode("utf-8")
+	client = sdk_retrying(client)
+	f = client.files.create(file=("ooda_batch.jsonl", io.BytesIO(data)), purpose="batch")
+	batch = client.batches.create(input_file_id=f.id, endpoint=BATCH_ENDPOINT, completion_window="24h")
+	print(f"Batch submitted: {batch.id} ({len(requests)} requests)")
+	return batch.id
+
+
+def await_batch(client: OpenAI, batch_id: str, poll: int = 30):
+	client = sdk_retrying(client)
+	while True:
+		try:
+			batch = client.batches.retrieve(batch_id)
+		except RETRYABLE_ERRORS as e:
+			# polling can last up to 24h: a transient outage only delays the next poll
+			print(f"Batch {batch_id}: poll failed ({type(e).__name__}), retrying in {poll}s")
+			time.sleep(poll)
+			continue
+		if batch.status in TERMINAL_STATUSES:
+			break
+		counts = batch.request_counts
+		if counts is not None:
+			print(f"Batch {batch_id}: {batch.status} ({counts.completed}/{counts.total})")
+		time.sleep(poll)
+	if batch.status != "completed":
+		raise RuntimeError(f"Batch {batch_id} ended with status: {batch.status}")
+	return batch
+
+
+def download_results(client: OpenAI, batch) -> Dict[str, str]:
+	"""
+	custom_id -> message content, for the requests that succeeded (failures are reported and skipped).
+	"""
+	out = {}
+	if not batch.output_file_id:
+		return out
+	text = sdk_retrying(client).files.content(batch.output_file_id).text
+	for line in text.splitlines():
+		if not line.strip():
+			continue
+		rec = json.loads(line)
+		cid = rec.get("custom_id")
+		resp = rec.get("response") or {}
+		if rec.get("error") or resp.get("status_code") != 200:
+			print("FAILED batch request:", cid, rec.get("error") or resp.get("status_code"))
+			continue
+		out[cid] = resp["body"]["choices"][0]["message"]["content"]
+	return out
+
+
+def run_batch(client: OpenAI, requests: Dict[str, Dict], poll: int = 30) -> Dict[str, str]:
+	if not requests:
+		return {}
+	batch = await_batch(client, submit_batch(client, requests), poll=poll)
+	return download_results(client, batch)
@@ -62,7 +62,15 @@ def main():
 		help="Skip ORIENT (OpenAI)",
 	)
 
+	parser.add_argument(
+		"--batch",
+		action="store_true",
+		help="Run ORIENT/DECIDE through the OpenAI Batch API (50%% cheaper, up to 24h latency)",
+	)
+
 	args = parser.parse_args()
+	if args.batch:
+		os.environ["OODA_BATCH"] = "1"
 
 	print("\n==============================")
 	print(" AI Brand Reputation Monitoring")
@@ -94,6 +102,8 @@ def main():
 	if not args.skip_orient:
 		print("\n--- STEP 4/6: ORIENT (AI) ---")
 		ooda_orient_main()
+		# key/network already validated by ORIENT: no need to repeat the check in DECIDE
+		os.environ.setdefault("OODA_SKIP_SMOKE", "1")
 
 		print("\n--- EXTRA: EXPORT ORIENT ---")
 		export_orient_main()
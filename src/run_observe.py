@@ -1,3 +1,4 @@
+import argparse
 import subprocess
 import sys
 
@@ -8,9 +9,27 @@ def run(cmd):
 
 
 def main():
-	run([sys.executable, "src/init_db.py"])
-	run([sys.executable, "src/collect_rss.py"])
-	run([sys.executable, "src/export_raw.py"])
+	parser = argparse.ArgumentParser(description="OBSERVE only: init DB + collect RSS + export raw")
+	parser.add_argument(
+		"--subprocess",
+		action="store_true",
+		help="Run each step in its own interpreter (process isolation, for debugging)",
+	)
+	args = parser.parse_args()
+
+	if args.subprocess:
+		run([sys.executable, "src/init_db.py"])
+		run([sys.executable, "src/collect_rss.py"])
+		run([sys.executable, "src/export_raw.py"])
+	else:
+		# in-process (like orchestrator.py): one interpreter start, imports shared across steps
+		from init_db import main as init_db_main
+		from collect_rss import main as collect_rss_main
+		from export_raw import main as export_raw_main
+
+		init_db_main()
+		collect_rss_main()
+		export_raw_main()
 	print("\nDone. Check outputs/ and data/ooda.db")
 
 
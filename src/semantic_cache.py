@@ -0,0 +1,146 @@
+import os
+from typing import Dict, List, Tuple
+
+from openai import OpenAI
+
+from db import is_remote, published_cutoff
+from llm import create_embeddings
+
+try:
+	import numpy as np
+except ImportError:  # optional: without numpy the semantic cache is simply off
+	np = None
+
+EMBED_MODEL = "text-embedding-3-small"
+EMBED_BATCH = 256  # inputs per embeddings call
+EMBED_CHARS = 2000  # title + content sent per item
+SIM_THRESHOLD = 0.92  # cosine: same story, reworded
+LOOKBACK_DAYS = 30
+
+
+def use_semantic_cache() -> bool:
+	"""
+	Opt-in (OODA_SEMANTIC_CACHE=1, needs numpy): extra embeddings call per new item, and a
+	near-duplicate reuses another article's ORIENT verbatim.
+	"""
+	if np is None:
+		return False
+	return os.getenv("OODA_SEMANTIC_CACHE", "0").strip().lower() in ("1", "true", "yes")
+
+
+def ensure_embeddings_table(conn) -> None:
+	cur = conn.cursor()
+	vec_type = "BYTEA" if is_remote() else "BLOB"
+	cur.execute(f"""
+	CREATE TABLE IF NOT EXISTS item_embeddings (
+		raw_item_id INTEGER PRIMARY KEY,
+		vec {vec_type}
+	)
+	""")
+	conn.commit()
+
+
+def _item_text(item: Dict) -> str:
+	return ((item.get("title") or "") + "\n" + (item.get("content") or ""))[:EMBED_CHARS]
+
+
+def _unpack(blob) -> "np.ndarray":
+	return np.frombuffer(blob, dtype=np.float32)
+
+
+def embed_texts(client: OpenAI, texts: List[str]) -> "np.ndarray":
+	"""
+	(n, dim) float32, rows L2-normalized: cosine similarity is a plain dot product.
+	"""
+	vecs = []
+	for i in range(0, len(texts), EMBED_BATCH):
+		resp = create_embeddings(client, model=EMBED_MODEL, input=texts[i:i + EMBED_BATCH])
+		vecs.extend(d.embedding for d in resp.data)
+	m = np.asarray(vecs, dtype=np.float32)
+	norms = np.linalg.norm(m, axis=1, keepdims=True)
+	norms[norms == 0] = 1.0
+	return m / norms
+
+
+def _load_vectors(conn, raw_ids: List[int]) -> Dict[int, "np.ndarray"]:
+	if not raw_ids:
+		return {}
+	cur = conn.cursor()
+	placeholders = ",".join("?" for _ in raw_ids)
+	cur.execute(f"SELECT raw_item_id, vec FROM item_embeddings WHERE raw_item_id IN ({placeholders})", tuple(raw_ids))
+	return {int(r["raw_item_id"]): _unpack(r["vec"]) for r in cur.fetchall()}
+
+
+def _load_history(conn) -> Tuple[List[int], List[str], "np.ndarray"]:
+	"""
+	Embeddings of already-oriented items published in the last LOOKBACK_DAYS.
+	"""
+	cur = conn.cursor()
+	cur.execute("""
+		SELECT e.raw_item_id, r.brand, e.vec
+		FROM item_embeddings e
+		JOIN items_raw r ON r.id = e.raw_item_id
+		WHERE r.published_at >= ?
+			AND EXISTS (SELECT 1 FROM items_orient o WHERE o.raw_item_id = e.raw_item_id)
+	""", (published_cutoff(LOOKBACK_DAYS),))
+	rows = cur.fetchall()
+	if not rows:
+		return [], [], np.empty((0, 0), dtype=np.float32)
+	return (
+		[int(r["raw_item_id"]) for r in rows],
+		[r["brand"] or "" for r in rows],
+		np.vstack([_unpack(r["vec"]) for r in rows]),
+	)
+
+
+def _latest_orient(conn, raw_ids: List[int]) -> Dict[int, str]:
+	if not raw_ids:
+		return {}
+	cur = conn.cursor()
+	placeholders = ",".join("?" for _ in raw_ids)
+	cur.execute(f"""
+		SELECT raw_item_id, orient_json
+		FROM items_orient
+		WHERE id IN (SELECT MAX(id) FROM items_orient WHERE raw_item_id IN ({placeholders}) GROUP BY raw_item_id)
+	""", tuple(raw_ids))
+	return {int(r["raw_item_id"]): r["orient_json"] for r in cur.fetchall()}
+
+
+def find_near_duplicates(client: OpenAI, conn, items: List[Dict]) -> Dict[int, str]:
+	"""
+	raw_item_id -> orient_json of an already-oriented near-duplicate of the same brand (cosine >= SIM_THRESHOLD).
+	Items without a stored embedding are embedded (one call per EMBED_BATCH) and saved regardless
+	of a hit; caller commits.
+	"""
+	if not items:
+		return {}
+	ids = [int(it["id"]) for it in items]
+	known = _load_vectors(conn, ids)
+	missing = [it for it in items if int(it["id"]) not in known]
+	if missing:
+		fresh = embed_texts(client, [_item_text(it) for it in missing])
+		rows = []
+		for it, vec in zip(missing, fresh):
+			known[int(it["id"])] = vec
+			rows.append((int(it["id"]), vec.tobytes()))
+		conn.cursor().executemany("INSERT OR IGNORE INTO item_embeddings (raw_item_id, vec) VALUES (?, ?)", rows)
+
+	hist_ids, hist_brands, hist = _load_history(conn)
+	if not hist_ids:
+		return {}
+	queries = np.vstack([known[i] for i in ids])
+	if queries.shape[1] != hist.shape[1]:  # embedding model changed: vectors not comparable
+		return {}
+	sims = queries @ hist.T  # (new, history)
+	other_brand = np.array([it.get("brand") or "" for it in items])[:, None] != np.array(hist_brands)[None, :]
+	sims[other_brand] = -1.0
+	best = sims.argmax(axis=1)
+	matches = {}
+	for row, raw_id in enumerate(ids):
+		col = int(best[row])
+		if sims[row, col] >= SIM_THRESHOLD:
+			matches[raw_id] = hist_ids[col]
+	if not matches:
+		return {}
+	orient_by_raw = _latest_orient(conn, sorted(set(matches.values())))
+	return {raw_id: orient_by_raw[nb] for raw_id, nb in matches.items() if nb in orient_by_raw}
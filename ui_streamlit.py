@@ -2,19 +2,40 @@ import os
 import sys
 import io
 import re
-import base64
-from openai import OpenAI
+import codecs
+import hashlib
+import queue
+import threading
+import time
+from importlib.util import find_spec
 from dotenv import load_dotenv
 import subprocess
 from pathlib import Path
+from xml.sax.saxutils import escape
 
 import pandas as pd
 import yaml
 import streamlit as st
 
+try:
+	import orjson
+	_json_loads = orjson.loads
+except ImportError:
+	import json
+	_json_loads = json.loads  # optional speed-up only
+
+# optional: DOCX export of the briefing (imported lazily by _docx_api, on the first export)
+HAS_DOCX = find_spec("docx") is not None
+
+# optional: Rust XLSX reader (pandas >= 2.2 engine="calamine"); only probed, pandas imports it itself
+HAS_CALAMINE = find_spec("python_calamine") is not None
+
 st.session_state.setdefault("brief_docx", None)
 st.session_state.setdefault("brief_txt", None)
 st.session_state.setdefault("brief_brand", None)
+st.session_state.setdefault("report_path", None)
+st.session_state.setdefault("report_run_dir", None)
+st.session_state.setdefault("report_brand", None)
 st.session_state.setdefault("authed", False)
 st.session_state.setdefault("app_pwd", "")
 
@@ -31,10 +52,76 @@ APP_PASSWORD = os.getenv("APP_PASSWORD") or st.secrets.get("APP_PASSWORD", "")
 
 PROJECT_ROOT = Path(__file__).resolve().parent
 ORCH = PROJECT_ROOT / "src" / "orchestrator.py"
+LOG_FLUSH_SEC = 0.2  # pipeline log redraw at most ~5 times/sec...
+LOG_FLUSH_CHARS = 4096  # ...or as soon as this much new output is buffered
+LOG_READ_BYTES = 32768  # raw pipe read size: bursts arrive as one chunk, not line by line
+# pipeline step banners -> status box text: one case-insensitive scan per chunk
+_STATUS_MSG = {
+	"init db": "🔄 Initializing DB…",
+	"collect rss": "🔄 Collecting RSS feeds…",
+	"export raw": "🔄 Exporting raw data…",
+	"orient (ai)": "🔄 Orienting among the content…",
+	"decide (ai)": "🔄 Deciding intent and evaluating actions…",
+	"act (aggregated)": "🔄 Crafting action recommendations…",
+	"act (ai)": "🔄 Crafting action recommendations…",
+	"pipeline completed": "✅ Report completed!",
+}
+_STATUS_RE = re.compile("|".join(map(re.escape, _STATUS_MSG)), re.IGNORECASE)
+
+
+BRIEFING_TTL_SEC = 3600
+BRIEFING_RENDER_SEC = 0.1  # streamed briefing redraw at most ~10 times/sec
+
+
+@st.cache_resource(show_spinner=False)
+def _briefing_store() -> dict:
+	# process-wide {key: (monotonic ts, text)}, shared by sessions. Not st.cache_data: a miss
+	# streams into a page placeholder, which cache_data could not replay on later hits
+	return {}
+
+
+def _briefing_key(brand: str, items_text: str) -> str:
+	# order/whitespace-insensitive: the same top items (e.g. severity ties reshuffled) hit the cache
+	blocks = sorted(filter(None, (b.strip() for b in items_text.split("---"))))
+	items_hash = hashlib.sha256("\n---\n".join(blocks).encode("utf-8")).hexdigest()
+	return f"{brand.strip()}:{items_hash}"
+
+
+def generate_ooda_briefing(brand: str, items_text: str, placeholder=None) -> str:
+	"""
+	ACT briefing, cached: same brand + same top items -> no new OpenAI call on reruns.
+	session_state keeps a per-session copy that survives the process cache TTL.
+	On a miss the answer is streamed into placeholder (if given) as it arrives.
+	"""
+	brief_cache = st.session_state.setdefault("brief_cache", {})
+	key = _briefing_key(brand, items_text)
+	if key in brief_cache:
+		return brief_cache[key]
+
+	store = _briefing_store()
+	now = time.monotonic()
+	hit = store.get(key)
+	if hit is not None and now - hit[0] < BRIEFING_TTL_SEC:
+		text = hit[1]
+	else:
+		text = _generate_ooda_briefing(brand, items_text, placeholder)
+		for old_key in [k for k, (ts, _) in list(store.items()) if now - ts >= BRIEFING_TTL_SEC]:
+			store.pop(old_key, None)
+		store[key] = (time.monotonic(), text)
+	brief_cache[key] = text
+	return text
 
 
-def generate_ooda_briefing(brand: str, items_text: str) -> str:
-	client = OpenAI()
+@st.cache_resource(show_spinner=False)
+def _openai_client():
+	# one client (httpx pool + TLS) per server process; lru_cache would not survive script reruns.
+	# openai (~0.4 s to import) loaded here: the login page and cached briefings never pay for it
+	from openai import OpenAI
+	return OpenAI()
+
+
+def _generate_ooda_briefing(brand: str, items_text: str, placeholder=None) -> str:
+	client = _openai_client()
 
 	prompt = f"""
 You are an AI reputation analyst. Output only the ACT section of an OODA loop briefing
@@ -62,117 +149,280 @@ DATA (each item):
 {items_text}
 """
 
-	resp = client.chat.completions.create(
+	# streamed: the page shows the briefing from the first tokens instead of after the full answer
+	stream = client.chat.completions.create(
 		model="gpt-5-mini",
 		messages=[
 			{"role": "system", "content": "You are a strategic reputation monitoring assistant."},
 			{"role": "user", "content": prompt},
 		],
+		stream=True,
 	)
+	parts = []
+	last_render = 0.0
+	try:
+		for chunk in stream:
+			if not chunk.choices:
+				continue
+			delta = chunk.choices[0].delta.content
+			if not delta:
+				continue
+			parts.append(delta)
+			now = time.monotonic()
+			if placeholder is not None and now - last_render >= BRIEFING_RENDER_SEC:
+				placeholder.markdown("".join(parts))
+				last_render = now
+	finally:
+		stream.close()
+
+	return "".join(parts)
+
+
+# low-cardinality labels: category dtype -> comparisons / value_counts run on int8 codes
+CATEGORY_COLS = ("reputational_risk", "narrative_category", "intent_framing", "urgency")
+
+
+def _as_categories(d: pd.DataFrame) -> pd.DataFrame:
+	for c in CATEGORY_COLS:
+		if c in d.columns and not isinstance(d[c].dtype, pd.CategoricalDtype):
+			d[c] = d[c].astype("category")
+	return d
+
+
+def _as_numeric_severity(d: pd.DataFrame) -> pd.DataFrame:
+	# nlargest needs a numeric dtype: a stray text cell (older reports) becomes NaN instead of a TypeError
+	if "severity" in d.columns and not pd.api.types.is_numeric_dtype(d["severity"]):
+		d["severity"] = pd.to_numeric(d["severity"], errors="coerce")
+	return d
+
+
+# libyaml C loader if PyYAML was built with it (same safe semantics, much faster)
+_YAML_LOADER = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+
+@st.cache_data(show_spinner=False)
+def _load_feed_count(path: str, mtime: float) -> int:
+	# keyed on (path, mtime): re-parsed only when config.yaml is edited.
+	# only the count is cached: a hit unpickles an int, not the whole config dict
+	with open(path, "r", encoding="utf-8") as f:
+		cfg = yaml.load(f, Loader=_YAML_LOADER) or {}
+	return len(cfg.get("observe", {}).get("rss", {}).get("feeds", []))
+
+
+PUBLISHED_DT_COL = "_published_dt"
+
+
+def _to_utc(col: pd.Series) -> pd.Series:
+	return pd.to_datetime(col, errors="coerce", utc=True)
+
+
+def _with_published_dt(d: pd.DataFrame) -> pd.DataFrame:
+	# parsed once per cached load, so reruns only compare against the cutoff
+	# date fallback: published_at -> created_at (utc=True: always tz-aware UTC)
+	if "published_at" in d.columns:
+		published_dt = _to_utc(d["published_at"])
+	else:
+		published_dt = pd.Series(pd.NaT, index=d.index, dtype="datetime64[ns, UTC]")
+	if published_dt.isna().all() and "created_at" in d.columns:
+		published_dt = _to_utc(d["created_at"])
+	d[PUBLISHED_DT_COL] = published_dt
+	return d
+
+
+@st.cache_data(show_spinner=False)
+def _load_report(path: str, mtime: float) -> pd.DataFrame:
+	# keyed on (path, mtime): reruns reuse the parsed sheet until the file changes
+	return _with_published_dt(_as_numeric_severity(_as_categories(_read_report_sheet(path))))
+
+
+def _read_report_sheet(path: str) -> pd.DataFrame:
+	if HAS_CALAMINE:
+		try:
+			return pd.read_excel(path, sheet_name="REPORT", engine="calamine")
+		except ValueError:
+			pass  # pandas < 2.2: unknown engine -> openpyxl below
+	# read_only/data_only: openpyxl streams cell values, no style/formula objects
+	wb_kwargs = {"read_only": True, "data_only": True, "keep_links": False}
+	try:
+		return pd.read_excel(path, sheet_name="REPORT", engine="openpyxl", engine_kwargs=wb_kwargs)
+	except TypeError:
+		# pandas < 2.1 has no engine_kwargs: same fast path through openpyxl directly
+		from openpyxl import load_workbook
+		wb = load_workbook(path, **wb_kwargs)
+		try:
+			rows = list(wb["REPORT"].values)
+		finally:
+			wb.close()
+		if not rows:
+			return pd.DataFrame()
+		return pd.DataFrame(rows[1:], columns=rows[0])
+
+
+@st.cache_data(show_spinner=False)
+def _load_export(path: str, mtime: float) -> pd.DataFrame:
+	if path.lower().endswith(".json"):
+		# bytes straight to the C parser (no text decode pass)
+		with open(path, "rb") as f:
+			data = _json_loads(f.read())
+		return _with_published_dt(_as_numeric_severity(_as_categories(pd.DataFrame.from_records(data))))
+	return _with_published_dt(_as_numeric_severity(_as_categories(pd.read_csv(path))))
+
+
+BRIEFING_COLS = ["title", "url", "published_at", "severity", "reputational_risk", "recommended_action"]
+PRIORITY_COLS = ["title", "url", "severity", "intent_framing", "urgency"]
+
+
+def risk_counts(d: pd.DataFrame) -> tuple[int, int, int]:
+	# (low, medium, high) from one value_counts pass instead of three == scans
+	vc = d["reputational_risk"].value_counts()
+	return int(vc.get("low", 0)), int(vc.get("medium", 0)), int(vc.get("high", 0))
+
+
+def priority_lines(top: pd.DataFrame) -> list[str]:
+	# DECIDE "Top 3" bullets (page + download); itertuples: plain tuples, no Series per row
+	return [
+		f"- [{title}]({url}) — severity **{severity}**, intent **{intent}**, urgency **{urgency}**"
+		for title, url, severity, intent, urgency in top[PRIORITY_COLS].itertuples(index=False, name=None)
+	]
+
+
+# inline markdown for the DOCX export: [text](url) | **bold** | *italic* (compiled once)
+_MD_INLINE = re.compile(
+	r"\[(?P<link_text>[^\]]+)\]\((?P<link_url>[^)]+)\)"
+	r"|\*\*(?P<bold>[^*]+)\*\*"
+	r"|\*(?P<italic>[^*]+)\*"
+)
+
+
+@st.cache_data(show_spinner=False)
+def _docx_bytes(page_md: str, detail_rows: tuple, brand: str) -> bytes | None:
+	# same briefing markdown + rows -> same DOCX: built once, not on every rerun
+	return briefing_to_docx(brand, page_md, detail_rows)
+
+
+_RUN_BREAKS = re.compile(r"([\t\r\n])")
+
+
+def _w_run(text: str, rpr: str = "") -> str:
+	# same <w:r> python-docx add_run builds: tab -> <w:tab/>, CR/LF -> <w:br/>, xml:space="preserve" on padded text
+	parts = []
+	for chunk in _RUN_BREAKS.split(text):
+		if chunk == "\t":
+			parts.append("<w:tab/>")
+		elif chunk in ("\r", "\n"):
+			parts.append("<w:br/>")
+		elif chunk:
+			space = ' xml:space="preserve"' if len(chunk.strip()) < len(chunk) else ""
+			parts.append(f"<w:t{space}>{escape(chunk)}</w:t>")
+	return f"<w:r>{rpr}{''.join(parts)}</w:r>"
+
+
+# run properties of the DOCX blocks: bold + brand blue (4A81E8), size in half-points
+_HEADING_RPR = '<w:rPr><w:b/><w:color w:val="4A81E8"/><w:sz w:val="40"/></w:rPr>'
+_SUBHEADING_RPR = '<w:rPr><w:b/><w:color w:val="4A81E8"/><w:sz w:val="28"/></w:rPr>'
+_BOLD_RPR = "<w:rPr><w:b/></w:rPr>"
+_ITALIC_RPR = "<w:rPr><w:i/></w:rPr>"
+_HYPERLINK_RT = "http://schemas.openxmlformats.org/officeDocument/2006/relationships/hyperlink"
+
 
-	return resp.choices[0].message.content
+@st.cache_resource(show_spinner=False)
+def _docx_api():
+	from docx import Document  # type: ignore
+	from docx.oxml import parse_xml  # type: ignore
+	from docx.oxml.ns import nsdecls  # type: ignore
+	from docx.shared import Pt  # type: ignore
+	return Document, parse_xml, nsdecls("w", "r"), Pt
 
 
-def briefing_to_docx(brand: str, briefing_text: str) -> bytes | None:
+def briefing_to_docx(brand: str, briefing_text: str, detail_rows=()) -> bytes | None:
+	"""
+	briefing_text: page markdown; detail_rows: (title, url, severity, intent, source_txt) bullets
+	appended as-is after it (already structured: no markdown round-trip).
+	"""
+	if not HAS_DOCX:
+		return None
 	try:
-		from docx import Document  # type: ignore
-		from docx.oxml import OxmlElement  # type: ignore
-		from docx.oxml.ns import qn  # type: ignore
-		from docx.shared import Pt, RGBColor  # type: ignore
+		Document, parse_xml, docx_ns, Pt = _docx_api()
 	except ImportError:
 		return None
 
-	def add_hyperlink(paragraph, text, url):
-		# Adapted helper to create hyperlink inline
-		part = paragraph.part
-		r_id = part.relate_to(url, "http://schemas.openxmlformats.org/officeDocument/2006/relationships/hyperlink", is_external=True)
-		hyperlink = OxmlElement('w:hyperlink')
-		hyperlink.set(qn('r:id'), r_id)
-
-		new_run = OxmlElement('w:r')
-		r_pr = OxmlElement('w:rPr')
-		r_style = OxmlElement('w:rStyle')
-		r_style.set(qn('w:val'), 'Hyperlink')
-		r_pr.append(r_style)
-		new_run.append(r_pr)
-		text_elm = OxmlElement('w:t')
-		text_elm.text = text
-		new_run.append(text_elm)
-		hyperlink.append(new_run)
-		paragraph._p.append(hyperlink)
-
-	def add_text_with_links(paragraph, line: str):
-		# parse links, bold **text**, italics *text*
-		pattern = re.compile(r'\[([^\]]+)\]\(([^)]+)\)|(\*\*([^*]+)\*\*)|(\*([^*]+)\*)')
-		pos = 0
-		for m in pattern.finditer(line):
-			if m.start() > pos:
-				paragraph.add_run(line[pos:m.start()])
-			if m.group(1) and m.group(2):
-				add_hyperlink(paragraph, m.group(1), m.group(2))
-			elif m.group(4):
-				run = paragraph.add_run(m.group(4))
-				run.bold = True
-			elif m.group(6):
-				run = paragraph.add_run(m.group(6))
-				run.italic = True
-			pos = m.end()
-		if pos < len(line):
-			paragraph.add_run(line[pos:])
-
 	bio = io.BytesIO()
 	doc = Document()
 	# base style
 	style = doc.styles["Normal"]
 	style.font.name = "Calibri"
 	style.font.size = Pt(11)
+	# python-docx only for the container: the body is emitted as one XML string and parsed once
+	part = doc.part
+	bullet_style = doc.styles["List Bullet"].style_id
+
+	def hyperlink_xml(text: str, url: str) -> str:
+		# relationships registered in reading order: same rIds as before
+		r_id = part.relate_to(url, _HYPERLINK_RT, is_external=True)
+		return (
+			f'<w:hyperlink r:id="{escape(r_id)}">'
+			'<w:r><w:rPr><w:rStyle w:val="Hyperlink"/></w:rPr>'
+			f'<w:t>{escape(text)}</w:t></w:r></w:hyperlink>'
+		)
 
-	def heading(text, level=1, color=RGBColor(74, 129, 232)):
-		p = doc.add_paragraph()
-		run = p.add_run(text)
-		run.bold = True
-		run.font.size = Pt(20 if level == 1 else 16)
-		run.font.color.rgb = color
-		if level == 1:
-			p.space_after = Pt(12)
-		else:
-			p.space_before = Pt(6)
-		return p
-
-	def subheading(text):
-		p = doc.add_paragraph()
-		run = p.add_run(text)
-		run.bold = True
-		run.font.size = Pt(14)
-		run.font.color.rgb = RGBColor(74, 129, 232)
-		p.space_before = Pt(6)
-		p.space_after = Pt(4)
-		return p
+	def inline_xml(line: str) -> str:
+		# parse links, bold **text**, italics *text*
+		out = []
+		pos = 0
+		for m in _MD_INLINE.finditer(line):
+			if m.start() > pos:
+				out.append(_w_run(line[pos:m.start()]))
+			if m.group("link_text") and m.group("link_url"):
+				out.append(hyperlink_xml(m.group("link_text"), m.group("link_url")))
+			elif m.group("bold"):
+				out.append(_w_run(m.group("bold"), _BOLD_RPR))
+			elif m.group("italic"):
+				out.append(_w_run(m.group("italic"), _ITALIC_RPR))
+			pos = m.end()
+		if pos < len(line):
+			out.append(_w_run(line[pos:]))
+		return "".join(out)
+
+	def bullet(text: str) -> str:
+		return f'<w:p><w:pPr><w:pStyle w:val="{bullet_style}"/></w:pPr>{inline_xml(text.strip())}</w:p>'
+
+	# line prefix (up to the first space) -> block handler: one dict lookup instead of a startswith chain
+	blocks = {
+		"##": lambda text: f"<w:p>{_w_run(text, _HEADING_RPR)}</w:p>",
+		"###": lambda text: f"<w:p>{_w_run(text, _SUBHEADING_RPR)}</w:p>",
+		"####": lambda text: f"<w:p>{_w_run(text, _SUBHEADING_RPR)}</w:p>",
+		"-": bullet,
+		"*": bullet,
+	}
 
 	# parse markdown-like briefing_text produced from page
+	paragraphs = []
 	for raw_line in briefing_text.splitlines():
 		line = raw_line.rstrip()
 		ls = line.lstrip()
 		if not ls:
-			doc.add_paragraph()
-			continue
-		if ls.startswith("## "):
-			heading(ls[3:], level=1)
-			continue
-		if ls.startswith("### "):
-			subheading(ls[4:])
-			continue
-		if ls.startswith("#### "):
-			subheading(ls[5:])
-			continue
-		if ls.startswith("- ") or ls.startswith("* "):
-			content = ls[2:].strip()
-			p = doc.add_paragraph(style="List Bullet")
-			add_text_with_links(p, content)
+			paragraphs.append("<w:p/>")
 			continue
+		prefix, sep, rest = ls.partition(" ")
+		handler = blocks.get(prefix) if sep else None
+		if handler is not None:
+			paragraphs.append(handler(rest))
 		else:
-			p = doc.add_paragraph()
-			add_text_with_links(p, line)
+			paragraphs.append(f"<w:p>{inline_xml(line)}</w:p>")
+
+	# detailed report: "title — severity **s**, intent **i** • source", same runs the markdown produced
+	bullet_ppr = f'<w:pPr><w:pStyle w:val="{bullet_style}"/></w:pPr>'
+	for title, url, severity, intent, source_txt in detail_rows:
+		head = f"{hyperlink_xml(title, url)}{_w_run(' — severity ')}" if url else _w_run(f"{title} — severity ")
+		tail = _w_run(source_txt) if source_txt else ""
+		paragraphs.append(
+			f"<w:p>{bullet_ppr}{head}{_w_run(severity, _BOLD_RPR)}{_w_run(', intent ')}{_w_run(intent, _BOLD_RPR)}{tail}</w:p>"
+		)
+
+	body = doc.element.body
+	sect_pr = body.sectPr  # paragraphs go before the section properties, like add_paragraph
+	for p in parse_xml(f'<w:body {docx_ns}>{"".join(paragraphs)}</w:body>'):
+		sect_pr.addprevious(p)
 
 	doc.save(bio)
 	return bio.getvalue()
@@ -228,7 +478,7 @@ if run:
 
 	with st.expander("Logs", expanded=False):
 		log_box = st.empty()
-		log_text = ""
+		log_buf = io.StringIO()  # append-only, no quadratic str +=
 
 	proc = subprocess.Popen(
 		[sys.executable, str(ORCH)],
@@ -236,34 +486,63 @@ if run:
 		env=env,
 		stdout=subprocess.PIPE,
 		stderr=subprocess.STDOUT,
-		text=True,
-		bufsize=1,
-		encoding="utf-8",
-		errors="replace",
+		bufsize=0,
 	)
 
+	# stdout read on a daemon thread: the script thread never blocks on a stalled pipe.
+	# blocking os.read in the thread instead of select/poll: works on Windows pipes too
+	chunks_q: queue.Queue = queue.Queue()
+
+	def _pump_stdout():
+		# utf-8 + universal newlines, chunk-boundary safe (same text text=True produced)
+		decoder = io.IncrementalNewlineDecoder(codecs.getincrementaldecoder("utf-8")(errors="replace"), translate=True)
+		fd = proc.stdout.fileno()
+		while True:
+			data = os.read(fd, LOG_READ_BYTES)
+			if not data:
+				break
+			text = decoder.decode(data)
+			if text:
+				chunks_q.put(text)
+		tail = decoder.decode(b"", final=True)
+		if tail:
+			chunks_q.put(tail)
+		chunks_q.put(None)  # EOF
+
+	threading.Thread(target=_pump_stdout, daemon=True).start()
+
 	try:
-		for line in proc.stdout:
-			ln = line.strip()
-			low = ln.lower()
-			if "init db" in low:
-				status_box.write("🔄 Initializing DB…")
-			elif "collect rss" in low:
-				status_box.write("🔄 Collecting RSS feeds…")
-			elif "export raw" in low:
-				status_box.write("🔄 Exporting raw data…")
-			elif "orient (ai)" in low:
-				status_box.write("🔄 Orienting among the content…")
-			elif "decide (ai)" in low:
-				status_box.write("🔄 Deciding intent and evaluating actions…")
-			elif "act (aggregated)" in low or "act (ai)" in low:
-				status_box.write("🔄 Crafting action recommendations…")
-			elif "pipeline completed" in low:
-				status_box.write("✅ Report completed!")
-
-			log_text += line
+		last_flush = 0.0
+		pending = 0  # chars not yet shown in log_box
+		partial = ""  # last incomplete line, matched once its newline arrives
+		eof = False
+		while not eof:
 			try:
-				log_box.code(log_text if log_text else "(no stdout)")
+				chunk = chunks_q.get(timeout=LOG_FLUSH_SEC)
+			except queue.Empty:
+				chunk = ""
+			if chunk is None:
+				eof = True
+				chunk = ""
+			# status triggers matched on complete lines only (a trigger split across chunks waits for its newline)
+			text = partial + chunk
+			cut = len(text) if eof else text.rfind("\n") + 1
+			partial = text[cut:]
+			last = None  # last trigger in the chunk wins: one status redraw per chunk
+			for last in _STATUS_RE.finditer(text, 0, cut):
+				pass
+			if last:
+				status_box.write(_STATUS_MSG[last.group(0).lower()])
+
+			log_buf.write(chunk)
+			pending += len(chunk)
+			now = time.monotonic()
+			if eof or not pending or (now - last_flush < LOG_FLUSH_SEC and pending < LOG_FLUSH_CHARS):
+				continue  # final flush after the loop
+			last_flush = now
+			pending = 0
+			try:
+				log_box.code(log_buf.getvalue())
 			except Exception:
 				# UI/websocket closed: stop streaming and terminate process
 				if proc.poll() is None:
@@ -276,6 +555,7 @@ if run:
 				proc.wait(timeout=2)
 			except Exception:
 				pass
+	log_text = log_buf.getvalue()
 	log_box.code(log_text if log_text else "(no stdout)")
 	st.caption(f"Exit code: {proc.returncode}")
 
@@ -285,12 +565,14 @@ if run:
 		st.error("Cartella runs non trovata.")
 		st.stop()
 
-	run_folders = sorted([p for p in runs_dir.iterdir() if p.is_dir()], key=lambda p: p.stat().st_mtime, reverse=True)
+	# scandir: is_dir() comes from the dirent, no extra stat per folder for the type check
+	with os.scandir(runs_dir) as it:
+		run_folders = [e for e in it if e.is_dir()]
 	if not run_folders:
 		st.error("Nessuna run trovata.")
 		st.stop()
 
-	latest_run = run_folders[0]
+	latest_run = Path(max(run_folders, key=lambda e: e.stat().st_mtime).path)
 	last_path_file = latest_run / "last_report_path.txt"
 	if not last_path_file.exists():
 		st.error("last_report_path.txt non trovato. Assicurati che orchestrator lo scriva.")
@@ -301,9 +583,20 @@ if run:
 		st.error(f"Report non trovato: {report_path}")
 		st.stop()
 
+	# ricorda l'ultima run: il report resta visibile nei rerun successivi senza rilanciare la pipeline
+	st.session_state["report_path"] = str(report_path)
+	st.session_state["report_run_dir"] = str(latest_run)
+	st.session_state["report_brand"] = brand
+
+if st.session_state["report_path"]:
+	# report of the last run (this click or an earlier one): DataFrames come from the (path, mtime) caches
+	brand = st.session_state["report_brand"]
+	latest_run = Path(st.session_state["report_run_dir"])
+	report_path = Path(st.session_state["report_path"])
+
 	# carica foglio REPORT
 	try:
-		df = pd.read_excel(report_path, sheet_name="REPORT")
+		df = _load_report(str(report_path), report_path.stat().st_mtime)
 	except Exception as e:
 		st.error(f"Errore leggendo Excel/REPORT: {e}")
 		st.stop()
@@ -311,45 +604,66 @@ if run:
 	# aggiungi colonna brand (dal campo di input)
 	df["brand"] = brand
 
-	# prendiamo fino a 30 item (decide è <=30) ordinati per severity e costruiamo un testo compatto per il briefing
-	top_items = df.sort_values("severity", ascending=False).head(30)
-	items_text = ""
-	for _, row in top_items.iterrows():
-		items_text += f"""
-TITLE: {row['title']}
-URL: {row['url']}
-PUBLISHED: {row['published_at']}
-SEVERITY: {row['severity']}
-RISK: {row['reputational_risk']}
-ACTION: {row['recommended_action']}
+	brand_lower = brand.lower()
+
+	def _filter_brand_date(df_in: pd.DataFrame) -> pd.DataFrame:
+		# masks only: the frame itself is sliced once at the end, never copied whole
+		# dates already parsed by the loader (PUBLISHED_DT_COL), not re-parsed per rerun
+		published_dt = df_in[PUBLISHED_DT_COL]
+
+		# rows without a valid datetime (NaT) compare False and drop out here
+		cutoff_local = pd.Timestamp.now(tz="UTC") - pd.Timedelta(days=10)
+		rows = (published_dt >= cutoff_local).to_numpy(dtype=bool).nonzero()[0]
+
+		if "brand" in df_in.columns:
+			# lowercase only the rows left in the date window; brand_lower computed once per run
+			brand_col = df_in["brand"].iloc[rows].astype("string").str.lower()
+			rows = rows[brand_col.eq(brand_lower).fillna(False).to_numpy(dtype=bool)]
+		return df_in.iloc[rows]
+
+	# finestra brand + ultimi 10 giorni, calcolata una volta: briefing, OBSERVE/ORIENT fallback, DECIDE
+	df_window = _filter_brand_date(df)
+
+	# prendiamo fino a 30 item (decide è <=30) per severity e costruiamo un testo compatto per il briefing
+	# nlargest = partial sort (O(n log k)) on the already filtered window
+	top_items = (df_window if len(df_window) else df).nlargest(30, "severity")
+	# one join over plain tuples (no per-row Series, no quadratic +=)
+	items_text = "".join(
+		f"""
+TITLE: {title}
+URL: {url}
+PUBLISHED: {published}
+SEVERITY: {severity}
+RISK: {risk}
+ACTION: {action}
 ---
 """
+		for title, url, published, severity, risk, action in top_items[BRIEFING_COLS].itertuples(index=False, name=None)
+	)
 
 	# helper per caricare ultimi export raw/orient (per OBSERVE/ORIENT totali)
 	def load_latest_export(run_dir: Path, prefix: str, ext: str = "json") -> pd.DataFrame | None:
-		import json
 		files = sorted(run_dir.glob(f"{prefix}_*.{ext}"), key=lambda p: p.stat().st_mtime, reverse=True)
 		if not files:
 			return None
 		fp = files[0]
 		try:
-			if fp.suffix.lower() == ".json":
-				with open(fp, "r", encoding="utf-8") as f:
-					data = json.load(f)
-				return pd.DataFrame(data)
-			else:
-				return pd.read_csv(fp)
+			return _load_export(str(fp), fp.stat().st_mtime)
 		except Exception:
 			return None
 
-	run_dir = latest_run
-	raw_df = load_latest_export(run_dir, "raw", "json")
-	if raw_df is None:
-		raw_df = load_latest_export(run_dir, "raw", "csv")
+	def load_export_any(run_dir: Path, prefix: str) -> pd.DataFrame | None:
+		# json export preferred, csv as fallback
+		out = load_latest_export(run_dir, prefix, "json")
+		return out if out is not None else load_latest_export(run_dir, prefix, "csv")
 
-	orient_df = load_latest_export(run_dir, "orient", "json")
-	if orient_df is None:
-		orient_df = load_latest_export(run_dir, "orient", "csv")
+	run_dir = latest_run
+	# raw + orient exports are independent file reads: load them concurrently
+	from concurrent.futures import ThreadPoolExecutor
+	with ThreadPoolExecutor(max_workers=2) as ex:
+		raw_fut = ex.submit(load_export_any, run_dir, "raw")
+		orient_fut = ex.submit(load_export_any, run_dir, "orient")
+		raw_df, orient_df = raw_fut.result(), orient_fut.result()
 
 	# ----------------- UNIFIED REPORT -----------------
 	st.subheader("🧠 Executive OODA Briefing (AI Generated)", anchor=None)
@@ -357,57 +671,21 @@ ACTION: {row['recommended_action']}
 	# OBSERVE
 	st.subheader("🔍 OBSERVE", anchor=None)
 	try:
-		with open(PROJECT_ROOT / "config.yaml", "r", encoding="utf-8") as f:
-			cfg = yaml.safe_load(f)
-		n_feeds = len(cfg.get("observe", {}).get("rss", {}).get("feeds", []))
+		cfg_path = PROJECT_ROOT / "config.yaml"
+		n_feeds = _load_feed_count(str(cfg_path), cfg_path.stat().st_mtime)
 	except Exception:
 		n_feeds = "N/A"
 
 	# defaults for later use
 	low_cnt = med_cnt = high_cnt = 0
 	top_cats_list = []
+	raw_window = orient_window = None
 
 	# usa raw export per OBSERVE se disponibile, altrimenti il report ACT
-	def _filter_brand_date(df_in: pd.DataFrame) -> pd.DataFrame:
-		df_work = df_in.copy()
-		# date fallback: published_at -> created_at
-		df_work["published_at_dt"] = pd.to_datetime(
-			df_work.get("published_at"),
-			errors="coerce",
-			utc=True,
-			infer_datetime_format=True,
-		)
-		if df_work["published_at_dt"].isna().all() and "created_at" in df_work.columns:
-			df_work["published_at_dt"] = pd.to_datetime(
-				df_work["created_at"],
-				errors="coerce",
-				utc=True,
-				infer_datetime_format=True,
-			)
-
-		# drop rows without a valid datetime before comparisons
-		df_work = df_work.dropna(subset=["published_at_dt"])
-
-		# ensure both sides are timezone-aware UTC
-		if df_work["published_at_dt"].dt.tz is None:
-			df_work["published_at_dt"] = df_work["published_at_dt"].dt.tz_localize("UTC")
-
-		cutoff_local = pd.Timestamp.now(tz="UTC") - pd.Timedelta(days=10)
-		date_mask = df_work["published_at_dt"] >= cutoff_local
-
-		if "brand" in df_work.columns:
-			brand_mask = df_work["brand"].fillna("").astype(str).str.lower() == brand.lower()
-		else:
-			# if brand column missing, do not filter by brand
-			brand_mask = True
-
-		return df_work[date_mask & brand_mask]
-
 	if raw_df is not None:
 		raw_window = _filter_brand_date(raw_df)
 		n_items = len(raw_window)
 	else:
-		df_window = _filter_brand_date(df)
 		n_items = len(df_window)
 
 	st.write(f"Found **{n_items}** recent mentions about **{brand}** across **{n_feeds}** monitored sources (last 10 days).")
@@ -417,9 +695,7 @@ ACTION: {row['recommended_action']}
 	st.subheader("🧭 ORIENT", anchor=None)
 	if orient_df is not None and "reputational_risk" in orient_df.columns:
 		orient_window = _filter_brand_date(orient_df)
-		low_cnt = (orient_window["reputational_risk"] == "low").sum()
-		med_cnt = (orient_window["reputational_risk"] == "medium").sum()
-		high_cnt = (orient_window["reputational_risk"] == "high").sum()
+		low_cnt, med_cnt, high_cnt = risk_counts(orient_window)
 
 		st.write(f"Out of {len(orient_window)} mentions (brand {brand}, last 10 days):")
 		st.markdown(
@@ -429,23 +705,16 @@ ACTION: {row['recommended_action']}
 		)
 
 		if "narrative_category" in orient_window.columns:
-			top_cats = orient_window["narrative_category"].value_counts().head(3)
+			top_cats = orient_window["narrative_category"].value_counts()
+			top_cats = top_cats[top_cats > 0].head(3)  # categorical: skip labels absent from the window
 			top_cats_list = list(top_cats.items())
 			st.markdown("Main emerging narratives:")
 			for cat, count in top_cats.items():
 				st.write(f"- **{cat}** ({count} mentions)")
 	else:
 		# fallback ai dati del report ACT
-		df["published_at_dt"] = pd.to_datetime(df["published_at"], errors="coerce")
-		cutoff = pd.Timestamp.now() - pd.Timedelta(days=10)
-		df_window = df[
-			(df["brand"].str.lower() == brand.lower())
-			& (df["published_at_dt"] >= cutoff)
-		]
 		if "reputational_risk" in df_window.columns:
-			low_cnt = (df_window["reputational_risk"] == "low").sum()
-			med_cnt = (df_window["reputational_risk"] == "medium").sum()
-			high_cnt = (df_window["reputational_risk"] == "high").sum()
+			low_cnt, med_cnt, high_cnt = risk_counts(df_window)
 			st.write(f"Out of {len(df_window)} mentions (brand {brand}, last 10 days):")
 			st.markdown(
 				f"- **{low_cnt}** classified as *low risk*\n"
@@ -455,7 +724,8 @@ ACTION: {row['recommended_action']}
 		else:
 			st.write(f"Out of {len(df_window)} mentions (brand {brand}, last 10 days): risk labels not available.")
 		if "narrative_category" in df_window.columns:
-			top_cats = df_window["narrative_category"].value_counts().head(3)
+			top_cats = df_window["narrative_category"].value_counts()
+			top_cats = top_cats[top_cats > 0].head(3)
 			top_cats_list = list(top_cats.items())
 			st.markdown("Main emerging narratives:")
 			for cat, count in top_cats.items():
@@ -463,24 +733,11 @@ ACTION: {row['recommended_action']}
 
 	# DECIDE
 	st.subheader("⚖️ DECIDE", anchor=None)
-	# assicurati che df_window esista per le sezioni successive
-	if 'df_window' not in locals():
-		df["published_at_dt"] = pd.to_datetime(df["published_at"], errors="coerce")
-		cutoff = pd.Timestamp.now() - pd.Timedelta(days=10)
-		df_window = df[
-			(df["brand"].str.lower() == brand.lower())
-			& (df["published_at_dt"] >= cutoff)
-		]
-
+	disinfo_df = None  # sorted once here, reused by the download markdown
 	if len(df_window) > 0 and "severity" in df_window.columns:
-		top_decide = df_window.sort_values("severity", ascending=False).head(3)
+		top_decide = df_window.nlargest(3, "severity")
 		st.markdown("**Top 3 priority issues:**")
-		lines = []
-		for _, row in top_decide.iterrows():
-			lines.append(
-				f"- [{row['title']}]({row['url']}) — severity **{row['severity']}**, intent **{row['intent_framing']}**, urgency **{row['urgency']}**"
-			)
-		st.markdown("\n".join(lines))
+		st.markdown("\n".join(priority_lines(top_decide)))
 
 		# Disinformation highlight
 		if "fact_check_status" in df_window.columns:
@@ -489,7 +746,7 @@ ACTION: {row['recommended_action']}
 				disinfo_df = df_window[disinfo_mask].sort_values("severity", ascending=False)
 				st.markdown(f"**{len(disinfo_df)} occurrences were classified as Disinformation:**")
 				dis_lines = []
-				for _, row in disinfo_df.iterrows():
+				for row in disinfo_df.to_dict("records"):
 					title = row.get("title", "Untitled")
 					url = row.get("url", "")
 					severity = row.get("severity", "N/A")
@@ -518,29 +775,9 @@ ACTION: {row['recommended_action']}
 	st.subheader("🚀 ACT", anchor=None)
 
 	# prepare unified dataframe for later reuse (brief + detailed section)
-	def _build_df_all():
-		def _maybe(name: str):
-			try:
-				return eval(name)
-			except NameError:
-				return None
-
-		candidates = [
-			_maybe("df_window"),
-			_maybe("orient_window"),
-			_maybe("raw_window"),
-			_maybe("df"),  # full ACT df
-			_maybe("orient_df"),
-			_maybe("raw_df"),
-		]
-
-		df_all_local = None
-		for cand in candidates:
-			if cand is None:
-				continue
-			if len(cand) > 0:
-				df_all_local = cand
-				break
+	def _build_df_all(*candidates: pd.DataFrame | None) -> pd.DataFrame:
+		# first non-empty candidate, in order of preference
+		df_all_local = next((c for c in candidates if c is not None and len(c) > 0), None)
 		if df_all_local is None:
 			df_all_local = pd.DataFrame()
 
@@ -548,12 +785,13 @@ ACTION: {row['recommended_action']}
 			df_all_local = df_all_local.sort_values("severity", ascending=False)
 		return df_all_local
 
-	df_all = _build_df_all()
+	df_all = _build_df_all(df_window, orient_window, raw_window, df, orient_df, raw_df)  # df = full ACT df
 
 	with st.spinner("Generating executive summary..."):
 		try:
-			briefing = generate_ooda_briefing(brand, items_text)
-			st.markdown(briefing)
+			brief_box = st.empty()
+			briefing = generate_ooda_briefing(brand, items_text, brief_box)
+			brief_box.markdown(briefing)
 
 			# build markdown matching on-page content
 			page_md_lines = []
@@ -578,25 +816,20 @@ ACTION: {row['recommended_action']}
 			page_md_lines.append(f"### ⚖️ DECIDE")
 			if 'top_decide' in locals() and len(top_decide) > 0:
 				page_md_lines.append("Top 3 priority issues:")
-				for _, row in top_decide.iterrows():
-					page_md_lines.append(
-						f"- [{row['title']}]({row['url']}) — severity **{row['severity']}**, intent **{row['intent_framing']}**, urgency **{row['urgency']}**"
-					)
+				page_md_lines.extend(priority_lines(top_decide))
 
 				# Disinformation list (for download)
-				if 'df_window' in locals() and "fact_check_status" in df_window.columns:
-					disinfo_df_dl = df_window[df_window["fact_check_status"] == "disinformation"].sort_values("severity", ascending=False)
-					if not disinfo_df_dl.empty:
-						page_md_lines.append("")
-						page_md_lines.append(f"{len(disinfo_df_dl)} occurrences were classified as Disinformation:")
-						for _, row in disinfo_df_dl.iterrows():
-							title = row.get("title", "Untitled")
-							url = row.get("url", "")
-							severity = row.get("severity", "N/A")
-							intent = row.get("intent_framing", "N/A")
-							urg = row.get("urgency", "N/A")
-							link_title = f"[{title}]({url})" if url else title
-							page_md_lines.append(f"- {link_title} — severity **{severity}**, intent **{intent}**, urgency **{urg}**")
+				if disinfo_df is not None:
+					page_md_lines.append("")
+					page_md_lines.append(f"{len(disinfo_df)} occurrences were classified as Disinformation:")
+					for row in disinfo_df.to_dict("records"):
+						title = row.get("title", "Untitled")
+						url = row.get("url", "")
+						severity = row.get("severity", "N/A")
+						intent = row.get("intent_framing", "N/A")
+						urg = row.get("urgency", "N/A")
+						link_title = f"[{title}]({url})" if url else title
+						page_md_lines.append(f"- {link_title} — severity **{severity}**, intent **{intent}**, urgency **{urg}**")
 			else:
 				page_md_lines.append("- No priority issues available.")
 			page_md_lines.append("")
@@ -606,11 +839,12 @@ ACTION: {row['recommended_action']}
 			# Append detailed report (ordered by severity desc)
 			page_md_lines.append("")
 			page_md_lines.append("### 📋 Detailed Report (top by severity)")
+			detail_rows = []  # DOCX gets the rows as tuples: no markdown compose + re-parse per mention
+			docx_md = None
 			if df_all is not None and not df_all.empty:
-				df_sorted = df_all.copy()
-				if "severity" in df_sorted.columns:
-					df_sorted = df_sorted.sort_values("severity", ascending=False)
-				for _, row in df_sorted.iterrows():
+				docx_md = "\n".join(page_md_lines)
+				# df_all is already sorted by severity desc (_build_df_all): no copy, no second sort
+				for row in df_all.to_dict("records"):
 					title = row.get("title", "Untitled")
 					url = str(row.get("url", "") or "").strip()
 					if url and not url.startswith("http"):
@@ -622,12 +856,13 @@ ACTION: {row['recommended_action']}
 					source_txt = f" • source: {source}" if source else ""
 					link_title = f"[{title}]({url})" if url else title
 					page_md_lines.append(f"- {link_title} — severity **{severity}**, intent **{intent}**{source_txt}")
+					detail_rows.append((str(title), url, str(severity), str(intent), source_txt))
 			else:
 				page_md_lines.append("- No detailed items available.")
 
 			page_md = "\n".join(page_md_lines)
 
-			docx_bytes = briefing_to_docx(brand, page_md)
+			docx_bytes = _docx_bytes(docx_md if docx_md is not None else page_md, tuple(detail_rows), brand)
 			st.session_state["brief_docx"] = docx_bytes
 			st.session_state["brief_txt"] = page_md
 			st.session_state["brief_brand"] = brand
@@ -639,17 +874,18 @@ ACTION: {row['recommended_action']}
 	st.subheader("📊 Detailed Report", anchor=None)
 	# usa tutti i mention disponibili: preferisci dataset con tutte le colonne chiave
 	required_cols = ["published_at", "title", "url", "severity", "reputational_risk", "intent_framing"]
-	if "df_all" not in locals():
-		df_all = _build_df_all()
-	# drop duplicates by title+url to avoid repeated rows in detailed report
-	if not df_all.empty and {"title", "url"}.issubset(df_all.columns):
-		df_all = df_all.drop_duplicates(subset=["title", "url"], keep="first")
-	# ensure required columns exist to avoid empty table
-	for col in required_cols:
-		if col not in df_all.columns:
-			df_all[col] = None
-	available = required_cols
-	display_df = df_all[available].copy()
+	# drop duplicates by url to avoid repeated rows in detailed report: one normalized key
+	# (no #fragment, scheme + host lowercased) also catches the same article linked twice; the path stays
+	# case-sensitive (/News/A and /news/a can be different pages); rows without url are kept
+	if not df_all.empty and "url" in df_all.columns:
+		url_key = df_all["url"].astype("string[pyarrow]").fillna("").str.replace(r"#.*$", "", regex=True)
+		url_key = url_key.str.replace(r"^[^/]+//[^/]+", lambda m: m.group(0).lower(), regex=True)
+		dup = url_key.duplicated(keep="first") & url_key.ne("")
+		df_all = df_all.loc[~dup.to_numpy()]
+	# one projection (missing required columns -> empty, df_all left untouched) and compact dtypes:
+	# st.dataframe Arrow-serializes the frame on every rerun
+	display_df = df_all.reindex(columns=required_cols).astype({"title": "string[pyarrow]", "url": "string[pyarrow]"})
+	display_df["severity"] = pd.to_numeric(display_df["severity"], errors="coerce", downcast="integer")
 
 	st.dataframe(
 		display_df,
@@ -665,30 +901,26 @@ ACTION: {row['recommended_action']}
 
 # keep download available even after widget re-runs
 if st.session_state["brief_docx"] or st.session_state["brief_txt"]:
-	def _download_link(label: str, data: bytes | str, filename: str, mime: str) -> str:
-		if isinstance(data, str):
-			data_bytes = data.encode("utf-8")
-		else:
-			data_bytes = data
-		b64 = base64.b64encode(data_bytes).decode()
-		return f'<a href="data:{mime};base64,{b64}" download="{filename}" class="st-emotion-cache-link">{label}</a>'
-
+	# st.download_button: bytes served once from the media endpoint (no base64 data: URI re-sent each rerun);
+	# on_click="ignore": downloading does not rerun the script
 	st.subheader("Download latest briefing")
 	brand_for_name = st.session_state.get("brief_brand", "brand")
 	if st.session_state["brief_docx"]:
-		link = _download_link(
+		st.download_button(
 			"Download full briefing (DOCX)",
-			st.session_state["brief_docx"],
-			f"{brand_for_name}_executive_briefing.docx",
-			"application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+			data=st.session_state["brief_docx"],
+			file_name=f"{brand_for_name}_executive_briefing.docx",
+			mime="application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+			key="dl_docx",
+			on_click="ignore",
 		)
-		st.markdown(link, unsafe_allow_html=True)
 
 	if st.session_state["brief_txt"]:
-		link = _download_link(
+		st.download_button(
 			"Download full briefing (TXT)",
-			st.session_state["brief_txt"],
-			f"{brand_for_name}_executive_briefing.txt",
-			"text/plain",
+			data=st.session_state["brief_txt"],
+			file_name=f"{brand_for_name}_executive_briefing.txt",
+			mime="text/plain",
+			key="dl_txt",
+			on_click="ignore",
 		)
-		st.markdown(link, unsafe_allow_html=True)